@@ -19,8 +19,14 @@ See this gist for the original code: https://gist.github.com/kjlubick/8ea239ede6
 #
 # For more information about Monte Carlo Tree Search check out our web site at www.mcts.ai
 # Also read the article accompanying this code at ***URL HERE***
+import itertools
 import math
+import multiprocessing
 import random
+import threading
+import time
+from array import array
+from types import MappingProxyType
 
 
 # Strategy to function mapping.
@@ -58,6 +64,49 @@ VALUATION_FUNCTIONS = {
 
 }
 
+# The order of the per-strategy value sums kept by nodes, see Node.strategyWins.
+STRATEGIES = tuple(sorted(VALUATION_FUNCTIONS))
+
+
+def get_terminal_values(terminalState, valuation):
+    """
+    Return the valuation of the result of terminalState for each player.
+
+    The values are indexed by player, and index 0 (the root of a tree) is worth 0.0.
+    """
+    function = valuation['function']
+    return [0.0] + [function(terminalState.GetResult(p)) for p in terminalState.players]
+
+
+def sum_terminal_values(terminalStates, valuation):
+    """Return the sums of get_terminal_values over terminalStates, indexed by player."""
+    return [
+        sum(playerValues)
+        for playerValues in zip(*[get_terminal_values(st, valuation) for st in terminalStates])
+    ]
+
+
+def sum_terminal_values_by_strategy(terminalStates):
+    """Return the sums of get_terminal_values_by_strategy over terminalStates."""
+    return [
+        [sum(strategyValues) for strategyValues in zip(*playerValues)]
+        for playerValues in zip(*[get_terminal_values_by_strategy(st) for st in terminalStates])
+    ]
+
+
+def get_terminal_values_by_strategy(terminalState):
+    """
+    Return the valuations of the result of terminalState for each player under every strategy.
+
+    The values are indexed by player and then by the position of the strategy in STRATEGIES.
+    """
+    functions = [VALUATION_FUNCTIONS[strategy]['function'] for strategy in STRATEGIES]
+    values = [[0.0] * len(STRATEGIES)]
+    for p in terminalState.players:
+        result = terminalState.GetResult(p)
+        values.append([function(result) for function in functions])
+    return values
+
 
 class GameState:
     """
@@ -84,11 +133,12 @@ class GameState:
         st.playerToMove = self.playerToMove
         return st
 
-    def CloneAndRandomize(self, observer):
+    def CloneAndRandomize(self, observer, rng=random):
         """
         Create a deep clone of this game state.
 
-        Randomizes any information not visible to the specified observer player.
+        Randomizes any information not visible to the specified observer player,
+        drawing from the random generator rng.
         """
         return self.Clone()
 
@@ -118,63 +168,100 @@ class Node:
     A node in the game tree.
 
     Note wins is always from the viewpoint of playerJustMoved.
+    Children are indexed by move in childByMove, so moves must be hashable.
     """
 
+    __slots__ = (
+        'move', 'strategy', 'parentNode', 'childByMove', 'wins', 'visits',
+        'avails', 'playerJustMoved', 'isTalonClosed', 'whoClosedTalon', 'valuation',
+        'strategyWins', 'strategyVisits'
+    )
+
+    # Leaves share one read-only empty mapping until their first child is added.
+    NO_CHILDREN = MappingProxyType({})
+
     def __init__(
             self, move=None, parent=None, playerJustMoved=None,
-            isTalonClosed=False, whoClosedTalon=None, strategy='id'
+            isTalonClosed=False, whoClosedTalon=None, strategy='id', shared=False
     ):
         self.move = move  # the move that got us to this node - "None" for the root node
         self.strategy = strategy
         self.parentNode = parent  # "None" for the root node
-        self.childNodes = []
+        # Nodes shared by several threads get a mapping of their own up front, as threads
+        # replacing the shared one at once would each keep only their own child.
+        self.childByMove = {} if shared else self.NO_CHILDREN
         self.wins = 0
         self.visits = 0
         self.avails = 1
         self.playerJustMoved = playerJustMoved  # part of the state that the Node needs later
         self.isTalonClosed = isTalonClosed  # part of the state that the Node needs later
         self.whoClosedTalon = whoClosedTalon    # part of the state that the Node needs later
-        self.valuation_function = VALUATION_FUNCTIONS[self.strategy]['function']
-        self._min_value = VALUATION_FUNCTIONS[self.strategy]['min']
-        self._max_value = VALUATION_FUNCTIONS[self.strategy]['max']
+        # Children share the valuation of their parent instead of looking it up again.
+        self.valuation = parent.valuation if parent is not None else VALUATION_FUNCTIONS[strategy]
+        # The wins under every strategy in STRATEGIES, only kept when Update is given them,
+        # and the number of visits they were kept for.
+        self.strategyWins = None
+        self.strategyVisits = 0
+
+    @property
+    def childNodes(self):
+        """The children of this node, in the order they were added."""
+        return list(self.childByMove.values())
 
     def GetUntriedMoves(self, legalMoves):
         """Return the elements of legalMoves for which this node does not have children."""
-        # Find all moves for which this node *does* have children
-        triedMoves = [child.move for child in self.childNodes]
-        # Return all moves that are legal but have not been tried yet
-        return [move for move in legalMoves if move not in triedMoves]
+        childByMove = self.childByMove
+        return [move for move in legalMoves if move not in childByMove]
 
-    def UCBSelectChild(self, legalMoves, exploration=0.8):
+    def IsFullyExpanded(self, legalMoves):
+        """Return True if this node has a child for every element of legalMoves."""
+        childByMove = self.childByMove
+        for move in legalMoves:
+            if move not in childByMove:
+                return False
+        return True
+
+    def UCBSelectChild(self, legalMoves, exploration=0.8, weight=1):
         """
         Use the UCB1 formula to select a child node, filtered by the given list of legal moves.
 
         `exploration` is a constant balancing between exploitation and exploration.
+        `weight` is the number of visits the current iteration will count for.
         """
-        # Filter the list of children by the list of legal moves
-        legalChildren = [child for child in self.childNodes if child.move in legalMoves]
-        # Get the child with the highest UCB score.
+        legalMoves = set(legalMoves)
         # Rescale wins / visits to the range [0, 1] in case the valuation function doesn't.
-        s = max(
-            legalChildren,
-            key=lambda c:
-                (
-                    float(c.wins) / float(c.visits) - self._min_value
-                ) / (self._max_value - self._min_value) +
-                exploration * math.sqrt(math.log(c.avails) / float(c.visits))
-        )
-        # Update availability counts -- it is easier to do this now than during backpropagation
-        for child in legalChildren:
-            child.avails += 1
+        min_value = self.valuation['min']
+        value_range = self.valuation['max'] - min_value
+        sqrt, log = math.sqrt, math.log
+        # Score the legal children and update their availability counts in a single pass.
+        # Only a strictly higher score replaces the best child so far, like max().
+        s = None
+        bestScore = float('-inf')
+        # Iterate over a snapshot, as tree-parallel searches may add children meanwhile.
+        for child in tuple(self.childByMove.values()):
+            if child.move not in legalMoves:
+                continue
+            visits = float(child.visits)
+            score = (
+                (float(child.wins) / visits - min_value) / value_range +
+                exploration * sqrt(log(child.avails) / visits)
+            )
+            child.avails += weight
+            if score > bestScore:
+                s, bestScore = child, score
 
         # Return the child selected above
         return s
 
-    def AddChild(self, m, playerJustMoved, isTalonClosed, whoClosedTalon):
+    def AddChild(
+            self, m, playerJustMoved, isTalonClosed, whoClosedTalon, virtualLoss=0, shared=False
+    ):
         """
         Add a new child node for the move m.
 
-        Return the added child node.
+        The virtual loss is applied before the child becomes visible to other threads.
+        In a shared node (see Node), a child that another thread added for m meanwhile is
+        kept and gets the virtual loss instead. Return the child node for m.
         """
         if whoClosedTalon is not None:
             w = whoClosedTalon
@@ -189,21 +276,50 @@ class Node:
             playerJustMoved=playerJustMoved,
             isTalonClosed=isTalonClosed or m.close_talon,
             whoClosedTalon=w,
-            strategy=self.strategy
+            strategy=self.strategy,
+            shared=shared
         )
-        self.childNodes.append(n)
-        return n
+        if virtualLoss:
+            n.AddVirtualLoss(virtualLoss)
+        if self.childByMove is self.NO_CHILDREN:
+            self.childByMove = {m: n}
+            return n
+        child = self.childByMove.setdefault(m, n)
+        if child is not n and virtualLoss:
+            child.AddVirtualLoss(virtualLoss)
+        return child
+
+    def AddVirtualLoss(self, virtualLoss):
+        """Count virtualLoss pending visits as losses, to steer other threads elsewhere."""
+        self.visits += virtualLoss
+        self.wins += virtualLoss * self.valuation['min']
+
+    def RemoveVirtualLoss(self, virtualLoss):
+        """Take back virtual losses added by AddVirtualLoss."""
+        self.visits -= virtualLoss
+        self.wins -= virtualLoss * self.valuation['min']
 
-    def Update(self, terminalState):
+    def Update(self, values, valuesByStrategy=None, weight=1):
         """
         Update this node.
 
-        1. Increment the visit count by one.
-        2. increase the win count by the result of terminalState for self.playerJustMoved.
+        1. Increment the visit count by weight (the number of rollouts behind the values).
+        2. increase the win count by the value for self.playerJustMoved.
+        3. If valuesByStrategy is given, increase the wins under every strategy as well.
+
+        `values` holds the (summed) valuation of the terminal states for each player,
+        see get_terminal_values and get_terminal_values_by_strategy.
         """
-        self.visits += 1
+        self.visits += weight
         if self.playerJustMoved is not None:
-            self.wins += self.valuation_function(terminalState.GetResult(self.playerJustMoved))
+            self.wins += values[self.playerJustMoved]
+            if valuesByStrategy is not None:
+                if self.strategyWins is None:
+                    self.strategyWins = [0.0] * len(STRATEGIES)
+                strategyWins = self.strategyWins
+                for idx, value in enumerate(valuesByStrategy[self.playerJustMoved]):
+                    strategyWins[idx] += value
+                self.strategyVisits += weight
 
     def __repr__(self):
         """Represent a node as a string."""
@@ -237,26 +353,355 @@ class Node:
         return s
 
 
-def ISMCTS(rootstate, itermax, strategy='id', verbose=False):
+class ArrayTree:
+    """
+    A game tree whose node statistics are stored in arrays indexed by node id.
+
+    Node 0 is the root. The children of a node form a linked list through firstChild and
+    nextSibling, in the order they were added. NO_NODE marks a missing parent, child or
+    sibling. Moves are identified by their codes (see SchnapsenMove), and childMasks[n] has
+    the bit of every move code for which node n has a child, so legal move masks can be
+    checked against it directly. The arrays grow by doubling.
+    Note wins[n] is always from the viewpoint of playerJustMoved[n] (0 for the root).
+    """
+
+    NO_NODE = -1
+
+    def __init__(self, strategy='id', capacity=1024):
+        self.strategy = strategy
+        self.valuation = VALUATION_FUNCTIONS[strategy]
+        self.size = 0
+        self.wins = array('d')
+        self.visits = array('l')
+        self.avails = array('l')
+        self.parent = array('l')
+        self.firstChild = array('l')
+        self.nextSibling = array('l')
+        self.playerJustMoved = array('b')
+        self.childMasks = array('Q')
+        self.moves = []
+        self._Grow(capacity)
+        self._AddNode(move=None, parent=self.NO_NODE, playerJustMoved=0)
+
+    def _Grow(self, extra):
+        """Add room for extra nodes to every array."""
+        self.wins.extend(array('d', [0.0]) * extra)
+        for counts in (self.visits, self.avails, self.parent, self.firstChild, self.nextSibling):
+            counts.extend(array('l', [0]) * extra)
+        self.playerJustMoved.extend(array('b', [0]) * extra)
+        self.childMasks.extend(array('Q', [0]) * extra)
+        self.moves.extend([None] * extra)
+
+    def _AddNode(self, move, parent, playerJustMoved):
+        """Append a node without children and return its id."""
+        if self.size == len(self.moves):
+            self._Grow(self.size)
+        n = self.size
+        self.size += 1
+        self.wins[n] = 0.0
+        self.visits[n] = 0
+        self.avails[n] = 1
+        self.parent[n] = parent
+        self.firstChild[n] = self.NO_NODE
+        self.nextSibling[n] = self.NO_NODE
+        self.playerJustMoved[n] = playerJustMoved
+        self.childMasks[n] = 0
+        self.moves[n] = move
+        return n
+
+    def Children(self, node):
+        """Return the ids of the children of node, in the order they were added."""
+        children = []
+        child = self.firstChild[node]
+        while child != self.NO_NODE:
+            children.append(child)
+            child = self.nextSibling[child]
+        return children
+
+    def FindChild(self, node, move):
+        """Return the id of the child of node for move, or NO_NODE if there is none."""
+        if not self.childMasks[node] >> move.code & 1:
+            return self.NO_NODE
+        child = self.firstChild[node]
+        while child != self.NO_NODE:
+            if self.moves[child].code == move.code:
+                return child
+            child = self.nextSibling[child]
+        return self.NO_NODE
+
+    def GetUntriedMoves(self, node, legalMoves):
+        """Return the elements of legalMoves for which node does not have children."""
+        childMask = self.childMasks[node]
+        return [move for move in legalMoves if not childMask >> move.code & 1]
+
+    def IsFullyExpanded(self, node, legalMask):
+        """Return True if node has a child for every move code in legalMask."""
+        return legalMask & ~self.childMasks[node] == 0
+
+    def UCBSelectChild(self, node, legalMask, exploration=0.8, weight=1):
+        """
+        Use the UCB1 formula to select a child of node, filtered by the given legal move mask.
+
+        Return the id of the selected child.
+        """
+        moves, wins, visits, avails = self.moves, self.wins, self.visits, self.avails
+        nextSibling = self.nextSibling
+        min_value = self.valuation['min']
+        value_range = self.valuation['max'] - min_value
+        sqrt, log = math.sqrt, math.log
+        s = self.NO_NODE
+        bestScore = float('-inf')
+        child = self.firstChild[node]
+        while child != self.NO_NODE:
+            if legalMask >> moves[child].code & 1:
+                childVisits = float(visits[child])
+                score = (
+                    (wins[child] / childVisits - min_value) / value_range +
+                    exploration * sqrt(log(avails[child]) / childVisits)
+                )
+                avails[child] += weight
+                if score > bestScore:
+                    s, bestScore = child, score
+            child = nextSibling[child]
+        return s
+
+    def AddChild(self, node, m, playerJustMoved):
+        """
+        Add a new child of node for the move m.
+
+        Return the id of the added child.
+        """
+        n = self._AddNode(move=m, parent=node, playerJustMoved=playerJustMoved)
+        self.childMasks[node] |= 1 << m.code
+        child = self.firstChild[node]
+        if child == self.NO_NODE:
+            self.firstChild[node] = n
+        else:
+            while self.nextSibling[child] != self.NO_NODE:
+                child = self.nextSibling[child]
+            self.nextSibling[child] = n
+        return n
+
+    def Update(self, node, values, weight=1):
+        """Increment the visits of node by weight and add the value for its player to its wins."""
+        self.visits[node] += weight
+        self.wins[node] += values[self.playerJustMoved[node]]
+
+    def Node(self, node):
+        """Return a read-only view of node with the attributes of a Node."""
+        return ArrayNodeView(self, node)
+
+
+class ArrayNodeView:
+    """A read-only view of one node of an ArrayTree, for printing it like a Node."""
+
+    __slots__ = ('tree', 'index')
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    @property
+    def move(self):
+        return self.tree.moves[self.index]
+
+    @property
+    def wins(self):
+        return self.tree.wins[self.index]
+
+    @property
+    def visits(self):
+        return self.tree.visits[self.index]
+
+    @property
+    def avails(self):
+        return self.tree.avails[self.index]
+
+    @property
+    def playerJustMoved(self):
+        return self.tree.playerJustMoved[self.index] or None
+
+    @property
+    def parentNode(self):
+        parent = self.tree.parent[self.index]
+        return None if parent == ArrayTree.NO_NODE else ArrayNodeView(self.tree, parent)
+
+    @property
+    def childNodes(self):
+        return [ArrayNodeView(self.tree, child) for child in self.tree.Children(self.index)]
+
+    __repr__ = Node.__repr__
+    TreeToString = Node.TreeToString
+    IndentString = Node.IndentString
+    ChildrenToString = Node.ChildrenToString
+
+
+# Number of iterations between checks of the time and node budgets of a search.
+BUDGET_CHECK_INTERVAL = 16
+
+
+def is_root_decided(rootStatistics, numRootMoves, remainingVisits, valuation, confidence=None):
+    """
+    Return True if the search can stop because the move it returns is settled.
+
+    rootStatistics holds the wins and visits of each child of the root, and numRootMoves is
+    the number of legal moves at the root (unexpanded ones have no visits yet).
+    The move is settled if the lead in visits of the most visited child exceeds
+    remainingVisits (unless it is None), or if confidence is given, when all moves are
+    expanded and the Hoeffding interval at that confidence level of the mean value of the
+    most visited child lies above those of all other children.
+    """
+    visits = sorted((v for (w, v) in rootStatistics), reverse=True)
+    visits += [0] * (numRootMoves - len(rootStatistics))
+    if len(visits) < 2:
+        return True
+    if remainingVisits is not None and visits[0] - visits[1] > remainingVisits:
+        return True
+    if confidence is None or len(rootStatistics) < numRootMoves:
+        return False
+
+    scale = (valuation['max'] - valuation['min']) * math.sqrt(math.log(2.0 / (1.0 - confidence)))
+
+    def Interval(wins, visits):
+        radius = scale / math.sqrt(2.0 * visits)
+        return wins / visits - radius, wins / visits + radius
+
+    best = max(range(len(rootStatistics)), key=lambda idx: rootStatistics[idx][1])
+    lowerBound = Interval(*rootStatistics[best])[0]
+    return all(
+        Interval(*statistics)[1] < lowerBound
+        for idx, statistics in enumerate(rootStatistics) if idx != best
+    )
+
+
+def SearchIterations(
+        itermax, timeLimit=None, maxNodes=None, countNodes=None, isDecided=None, stop=None
+):
+    """
+    Yield the numbers of the iterations of a search until its budget runs out.
+
+    The search stops after itermax iterations (unlimited if None), after timeLimit seconds,
+    once countNodes() reaches maxNodes, once isDecided(remaining) returns True, where
+    remaining is the number of iterations left (None without itermax), or once the
+    threading.Event stop is set. These are only checked every BUDGET_CHECK_INTERVAL
+    iterations, and at least one iteration always runs.
+    """
+    if itermax is None and timeLimit is None and maxNodes is None and stop is None:
+        raise ValueError('A search needs an iteration, time or node budget.')
+    deadline = None if timeLimit is None else time.monotonic() + timeLimit
+    for i in range(itermax) if itermax is not None else itertools.count():
+        if i and i % BUDGET_CHECK_INTERVAL == 0:
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+            if maxNodes is not None and countNodes() >= maxNodes:
+                return
+            if isDecided is not None and isDecided(None if itermax is None else itermax - i):
+                return
+            if stop is not None and stop.is_set():
+                return
+        yield i
+
+
+def RandomRollout(state, rng=random):
+    """
+    Play random moves in state until the game is over.
+
+    Use the state's own DoRandomRollout if it has one.
+    """
+    if hasattr(state, 'DoRandomRollout'):
+        state.DoRandomRollout(rng)
+        return
+    moves = state.GetMoves()
+    while moves != []:  # while state is non-terminal
+        state.DoMove(move=rng.choice(moves))
+        moves = state.GetMoves()
+
+
+def RandomRollouts(state, rollouts):
+    """
+    Play rollouts random games from state.
+
+    The last game is played in state itself, the others in clones of it.
+    Return the terminal states.
+    """
+    terminalStates = [state.Clone() for _ in range(rollouts - 1)] + [state]
+    for terminalState in terminalStates:
+        RandomRollout(terminalState)
+    return terminalStates
+
+
+def Simulate(state, rollouts, solver=None):
+    """
+    Play rollouts random games from state and return the terminal states.
+
+    If solver is given and solver.CanSolve(state), play state out optimally with
+    solver.PlayOut instead. Every rollout would then end alike, so the terminal state
+    is returned rollouts times.
+    """
+    if solver is not None and solver.CanSolve(state):
+        solver.PlayOut(state)
+        return [state] * rollouts
+    return RandomRollouts(state, rollouts)
+
+
+def SearchTree(
+        rootstate, itermax, strategy='id', allStrategies=False, rollouts=1, timeLimit=None,
+        maxNodes=None, earlyStop=False, confidence=None, rootnode=None, observer=None, stop=None,
+        solver=None
+):
     """
     Conduct an ISMCTS search for itermax iterations starting from rootstate.
 
-    Return the best move from the rootstate.
+    The search determinizes rootstate from the point of view of observer, by default the
+    player to move. It also stops once the threading.Event stop is set.
+
+    The search stops early after timeLimit seconds or once the tree has maxNodes nodes.
+    With earlyStop, it also stops once no other root move can become the most visited one
+    in the remaining iterations, and with a confidence level, once the value of the most
+    visited root move is above the others at that confidence (see is_root_decided).
+
+    Return the root node of the search tree. If allStrategies is True, every node also keeps
+    its wins under every strategy (while still selecting by the given strategy).
+    Every iteration plays rollouts random games from its new leaf, which count as that many
+    visits of every node on its path.
+    If rootnode is given, the search continues in that tree instead of starting a new one
+    (maxNodes then counts its root as the only existing node).
+    With a solver, leaves it can solve are played out optimally instead (see Simulate).
     """
-    rootnode = Node(strategy=strategy)
+    if rootnode is None:
+        rootnode = Node(strategy=strategy)
+    if observer is None:
+        observer = rootstate.playerToMove
+    strategyIndex = STRATEGIES.index(strategy)
+    valuesByStrategy = None
+    numNodes = 1
+    rootMoves = rootstate.GetMoves()
+
+    def IsDecided(remaining):
+        return is_root_decided(
+            [(c.wins, c.visits) for c in rootnode.childByMove.values() if c.move in rootMoves],
+            len(rootMoves),
+            remaining * rollouts if earlyStop and remaining is not None else None,
+            rootnode.valuation, confidence
+        )
 
-    for i in range(itermax):
+    for i in SearchIterations(
+            itermax, timeLimit, maxNodes, countNodes=lambda: numNodes,
+            isDecided=IsDecided if earlyStop or confidence is not None else None, stop=stop
+    ):
         node = rootnode
 
         # Determinize
-        state = rootstate.CloneAndRandomize(rootstate.playerToMove)
+        state = rootstate.CloneAndRandomize(observer)
 
         # Select
         # While: node is fully expanded and non-terminal
         moves = state.GetMoves()
-        while moves != [] and node.GetUntriedMoves(legalMoves=moves) == []:
-            node = node.UCBSelectChild(legalMoves=moves)
-            state.DoMove(move=node.move)
+        while moves != [] and node.IsFullyExpanded(legalMoves=moves):
+            node = node.UCBSelectChild(legalMoves=moves, weight=rollouts)
+            # Play this determinization's own move, as equal moves may differ in details
+            # such as marriage points.
+            state.DoMove(move=moves[moves.index(node.move)])
             moves = state.GetMoves()
 
         # Expand
@@ -271,22 +716,342 @@ def ISMCTS(rootstate, itermax, strategy='id', verbose=False):
                 isTalonClosed=state.isTalonClosed,
                 whoClosedTalon=state.whoClosedTalon
             )  # add child and descend tree
+            numNodes += 1
 
         # Simulate
-        moves = state.GetMoves()
-        while moves != []:  # while state is non-terminal
-            state.DoMove(move=random.choice(moves))
-            moves = state.GetMoves()
+        terminalStates = Simulate(state, rollouts, solver)
 
         # Backpropagate
+        if not allStrategies:
+            values = sum_terminal_values(terminalStates, node.valuation)
+        else:
+            valuesByStrategy = sum_terminal_values_by_strategy(terminalStates)
+            values = [playerValues[strategyIndex] for playerValues in valuesByStrategy]
         while node is not None:  # backpropagate from the expanded node and work back to the root
-            node.Update(state)
+            node.Update(values, valuesByStrategy, weight=rollouts)
             node = node.parentNode
 
+    return rootnode
+
+
+def ISMCTS(
+        rootstate, itermax, strategy='id', verbose=False, report=None, rollouts=1, timeLimit=None,
+        maxNodes=None, earlyStop=False, confidence=None, statistics=None, rootnode=None,
+        observer=None, stop=None, solver=None
+):
+    """
+    Conduct an ISMCTS search for itermax iterations starting from rootstate.
+
+    Return the best move from the rootstate.
+
+    If rootnode is given, the search continues in that tree, which is updated in place.
+    Its root must stand for rootstate, e.g. a subtree of an earlier search reached by
+    the moves played since.
+    The search determinizes from the point of view of observer (by default the player to
+    move), and stops once the threading.Event stop is set.
+
+    If report is a dict, the search also keeps the wins of every node under every strategy
+    and fills report with the root move of highest mean value under each strategy.
+    Each iteration plays rollouts random games from its new leaf.
+    The search returns early after timeLimit seconds or once the tree has maxNodes nodes;
+    itermax may then be None. See SearchTree for earlyStop, confidence and solver.
+    If statistics is a dict, it receives the number of iterations run and saved.
+    """
+    previousVisits = 0 if rootnode is None else rootnode.visits
+    rootnode = SearchTree(
+        rootstate, itermax, strategy, allStrategies=report is not None, rollouts=rollouts,
+        timeLimit=timeLimit, maxNodes=maxNodes, earlyStop=earlyStop, confidence=confidence,
+        rootnode=rootnode, observer=observer, stop=stop, solver=solver
+    )
+    iterations = (rootnode.visits - previousVisits) // rollouts
+    if statistics is not None:
+        statistics['iterations'] = iterations
+        statistics['iterationsSaved'] = 0 if itermax is None else itermax - iterations
+
     # Output some information about the tree - can be omitted
+    if verbose > 1.0:
+        print(rootnode.TreeToString(0))
+    elif verbose:
+        print(rootnode.ChildrenToString())
+    if verbose and itermax is not None and iterations < itermax:
+        print('Stopped after {} of {} iterations.'.format(iterations, itermax))
+
+    # A reused tree may have root children for moves from other determinizations, so only
+    # consider the legal moves and return them as rootstate has them.
+    rootMoves = rootstate.GetMoves()
+    legalChildren = [c for c in rootnode.childNodes if c.move in rootMoves]
+
+    if report is not None:
+        # A reused tree may have been searched without a report before, so only compare the
+        # children by the visits that kept their wins under every strategy.
+        for idx, reportStrategy in enumerate(STRATEGIES):
+            best = max(
+                (c for c in legalChildren if c.strategyVisits),
+                key=lambda c: c.strategyWins[idx] / c.strategyVisits
+            )
+            report[reportStrategy] = rootMoves[rootMoves.index(best.move)]
+
+    best = max(legalChildren, key=lambda c: c.visits)  # return the most visited move
+    return rootMoves[rootMoves.index(best.move)]
+
+
+def SearchArrayTree(
+        rootstate, itermax, strategy='id', rollouts=1, timeLimit=None, maxNodes=None,
+        earlyStop=False, confidence=None, solver=None
+):
+    """
+    Conduct an ISMCTS search for itermax iterations starting from rootstate, using an ArrayTree.
+
+    Every iteration plays rollouts random games from its new leaf, or plays it out with
+    solver as for SearchTree. The search stops early after timeLimit seconds, once the tree
+    has maxNodes nodes, or as for SearchTree with earlyStop or confidence.
+    Return the search tree.
+    """
+    tree = ArrayTree(strategy=strategy)
+    root = 0
+    numRootMoves = len(rootstate.GetMoves())
+
+    def IsDecided(remaining):
+        return is_root_decided(
+            [(tree.wins[c], tree.visits[c]) for c in tree.Children(root)], numRootMoves,
+            remaining * rollouts if earlyStop and remaining is not None else None,
+            tree.valuation, confidence
+        )
+
+    for i in SearchIterations(
+            itermax, timeLimit, maxNodes, countNodes=lambda: tree.size,
+            isDecided=IsDecided if earlyStop or confidence is not None else None
+    ):
+        node = root
+
+        # Determinize
+        state = rootstate.CloneAndRandomize(rootstate.playerToMove)
+
+        # Select
+        moveMask = state.GetMoveMask()
+        while moveMask and tree.IsFullyExpanded(node, legalMask=moveMask):
+            node = tree.UCBSelectChild(node, legalMask=moveMask, weight=rollouts)
+            moves = state.GetMoves()
+            state.DoMove(move=moves[moves.index(tree.moves[node])])
+            moveMask = state.GetMoveMask()
+
+        # Expand
+        untriedMoves = tree.GetUntriedMoves(node, legalMoves=state.GetMoves())
+        if untriedMoves != []:
+            m = random.choice(untriedMoves)
+            player = state.playerToMove
+            state.DoMove(move=m)
+            node = tree.AddChild(node, m=m, playerJustMoved=player)
+
+        # Simulate
+        terminalStates = Simulate(state, rollouts, solver)
+
+        # Backpropagate
+        values = sum_terminal_values(terminalStates, tree.valuation)
+        while node != ArrayTree.NO_NODE:
+            tree.Update(node, values, weight=rollouts)
+            node = tree.parent[node]
+
+    return tree
+
+
+def ArrayISMCTS(
+        rootstate, itermax, strategy='id', verbose=False, rollouts=1, timeLimit=None,
+        maxNodes=None, earlyStop=False, confidence=None, statistics=None, solver=None
+):
+    """
+    Conduct an ISMCTS search for itermax iterations starting from rootstate, using an ArrayTree.
+
+    Each iteration plays rollouts random games from its new leaf. The search returns early
+    after timeLimit seconds, once the tree has maxNodes nodes, or as for SearchTree with
+    earlyStop, confidence or solver. If statistics is a dict, it receives the number of
+    iterations run and saved.
+    Return the best move from the rootstate.
+    """
+    tree = SearchArrayTree(
+        rootstate, itermax, strategy, rollouts=rollouts, timeLimit=timeLimit, maxNodes=maxNodes,
+        earlyStop=earlyStop, confidence=confidence, solver=solver
+    )
+    root = 0
+    iterations = tree.visits[root] // rollouts
+    if statistics is not None:
+        statistics['iterations'] = iterations
+        statistics['iterationsSaved'] = 0 if itermax is None else itermax - iterations
+
+    if verbose > 1.0:
+        print(tree.Node(root).TreeToString(0))
+    elif verbose:
+        print(tree.Node(root).ChildrenToString())
+    if verbose and itermax is not None and iterations < itermax:
+        print('Stopped after {} of {} iterations.'.format(iterations, itermax))
+
+    return tree.moves[max(tree.Children(root), key=lambda c: tree.visits[c])]
+
+
+def _SearchRootStatistics(arguments):
+    """
+    Run one search of ParallelISMCTS in a worker process.
+
+    Return the move, wins, visits, avails and playerJustMoved of every child of the root.
+    """
+    tree, rootstate, itermax, strategy, rollouts, timeLimit, maxNodes, solver, seed = arguments
+    # Every worker needs its own random stream, whichever way the pool started it.
+    random.seed(seed)
+    if tree == 'array':
+        arrayTree = SearchArrayTree(
+            rootstate, itermax, strategy, rollouts=rollouts, timeLimit=timeLimit,
+            maxNodes=maxNodes, solver=solver
+        )
+        return [
+            (
+                arrayTree.moves[c], arrayTree.wins[c], arrayTree.visits[c], arrayTree.avails[c],
+                arrayTree.playerJustMoved[c]
+            )
+            for c in arrayTree.Children(0)
+        ]
+    rootnode = SearchTree(
+        rootstate, itermax, strategy, rollouts=rollouts, timeLimit=timeLimit, maxNodes=maxNodes,
+        solver=solver
+    )
+    return [
+        (c.move, c.wins, c.visits, c.avails, c.playerJustMoved) for c in rootnode.childNodes
+    ]
+
+
+def ParallelISMCTS(
+        rootstate, itermax, strategy='id', verbose=False, workers=None, pool=None, tree='node',
+        rollouts=1, timeLimit=None, maxNodes=None, solver=None
+):
+    """
+    Conduct root-parallel ISMCTS searches of itermax iterations each starting from rootstate.
+
+    Each of the workers processes searches its own determinizations with its own random seed,
+    and the statistics of the children of their roots are summed before picking a move.
+    If pool is given, its processes are used, otherwise a pool of workers processes
+    (by default one per CPU) is started for this search only. The timeLimit and maxNodes
+    budgets apply to each worker's search, with the time counted from the start of that search.
+    Each worker plays out leaves with its own copy of solver, if given (see SearchTree).
+
+    Return the best move from the rootstate.
+    """
+    if pool is None:
+        with multiprocessing.Pool(workers) as newPool:
+            return ParallelISMCTS(
+                rootstate, itermax, strategy, verbose,
+                workers=workers or multiprocessing.cpu_count(), pool=newPool, tree=tree,
+                rollouts=rollouts, timeLimit=timeLimit, maxNodes=maxNodes, solver=solver
+            )
+    workers = workers or multiprocessing.cpu_count()
+    seeds = [random.getrandbits(64) for _ in range(workers)]
+    arguments = [
+        (tree, rootstate, itermax, strategy, rollouts, timeLimit, maxNodes, solver, seed)
+        for seed in seeds
+    ]
+
+    # Merge the root statistics into a single root node, keeping the order moves were found in.
+    rootnode = Node(strategy=strategy)
+    for statistics in pool.map(_SearchRootStatistics, arguments):
+        for move, wins, visits, avails, playerJustMoved in statistics:
+            child = rootnode.childByMove.get(move)
+            if child is None:
+                child = rootnode.AddChild(
+                    m=move, playerJustMoved=playerJustMoved, isTalonClosed=None,
+                    whoClosedTalon=None
+                )
+                child.avails = 0
+            child.wins += wins
+            child.visits += visits
+            child.avails += avails
+            rootnode.visits += visits
+
+    if verbose:
+        print(rootnode.ChildrenToString())
+
+    return max(rootnode.childNodes, key=lambda c: c.visits).move
+
+
+def _TreeParallelSearch(rootnode, rootstate, iterations, virtualLoss, seed, timeLimit):
+    """Run iterations of a TreeParallelISMCTS search in one thread."""
+    rng = random.Random(seed)
+    for i in SearchIterations(iterations, timeLimit):
+        node = rootnode
+        node.AddVirtualLoss(virtualLoss)
+
+        # Determinize
+        state = rootstate.CloneAndRandomize(rootstate.playerToMove, rng)
+
+        # Select
+        moves = state.GetMoves()
+        while moves != [] and node.IsFullyExpanded(legalMoves=moves):
+            node = node.UCBSelectChild(legalMoves=moves)
+            node.AddVirtualLoss(virtualLoss)
+            state.DoMove(move=moves[moves.index(node.move)])
+            moves = state.GetMoves()
+
+        # Expand
+        untriedMoves = node.GetUntriedMoves(legalMoves=moves)
+        if untriedMoves != []:
+            m = rng.choice(untriedMoves)
+            player = state.playerToMove
+            state.DoMove(move=m)
+            node = node.AddChild(
+                m=m,
+                playerJustMoved=player,
+                isTalonClosed=state.isTalonClosed,
+                whoClosedTalon=state.whoClosedTalon,
+                virtualLoss=virtualLoss,
+                shared=True
+            )
+
+        # Simulate
+        RandomRollout(state, rng)
+
+        # Backpropagate, replacing the virtual losses by the real result. Updating first
+        # keeps the visits of new children above zero for the threads selecting among them.
+        values = get_terminal_values(state, node.valuation)
+        while node is not None:
+            node.Update(values)
+            node.RemoveVirtualLoss(virtualLoss)
+            node = node.parentNode
+
+
+def TreeParallelISMCTS(rootstate, itermax, strategy='id', verbose=False, threads=2,
+                       virtualLoss=1, timeLimit=None):
+    """
+    Conduct a tree-parallel ISMCTS search of itermax iterations starting from rootstate.
+
+    The iterations are shared by threads searching a single tree. Nodes on the path of a
+    running iteration count virtualLoss extra lost visits, so other threads tend to explore
+    other children. Node statistics are updated without locks: on a standard build the GIL
+    makes lost updates rare, and on a free-threaded build an occasional lost update is
+    accepted in exchange for the parallelism. The virtual loss must be at least 1, so no
+    child that other threads can select is without visits. The search returns early after
+    timeLimit seconds; itermax may then be None.
+
+    Return the best move from the rootstate.
+    """
+    if virtualLoss < 1:
+        raise ValueError('A tree-parallel search needs a virtual loss of at least 1.')
+    rootnode = Node(strategy=strategy, shared=True)
+    workers = [
+        threading.Thread(
+            target=_TreeParallelSearch,
+            args=(
+                rootnode, rootstate.Clone(),
+                None if itermax is None else itermax // threads + (idx < itermax % threads),
+                virtualLoss, random.getrandbits(64), timeLimit
+            )
+        )
+        for idx in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
     if verbose > 1.0:
         print(rootnode.TreeToString(0))
     elif verbose:
         print(rootnode.ChildrenToString())
 
-    return max(rootnode.childNodes, key=lambda c: c.visits).move   # return the most visited move
+    return max(rootnode.childNodes, key=lambda c: c.visits).move
@@ -0,0 +1,82 @@
+"""
+Benchmark the ISMCTS search.
+
+Reports the time per iteration of a full search from a fresh deal and the memory used
+by each node of the search tree.
+
+Run `python benchmarks/bench_search.py --help` for the available options.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ISMCTS import ArrayTree, Node  # noqa: E402
+from players import TREE_TO_SEARCH_MAP  # noqa: E402
+from schnapsen import SchnapsenGameState  # noqa: E402
+
+
+def time_per_iteration(itermax, repeats, tree='node'):
+    """Return the mean number of seconds per ISMCTS iteration from fresh deals."""
+    search = TREE_TO_SEARCH_MAP[tree]
+    elapsed = 0.0
+    for _ in range(repeats):
+        state = SchnapsenGameState()
+        start = time.perf_counter()
+        search(rootstate=state, itermax=itermax)
+        elapsed += time.perf_counter() - start
+    return elapsed / (itermax * repeats)
+
+
+def memory_per_node(num_nodes, tree='node'):
+    """Return the number of bytes allocated per node of a tree with num_nodes nodes."""
+    moves = SchnapsenGameState().GetMoves()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    if tree == 'array':
+        array_tree = ArrayTree(capacity=num_nodes)
+        for idx in range(num_nodes - 1):
+            array_tree.AddChild(idx // len(moves), m=moves[idx % len(moves)], playerJustMoved=1)
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return (after - before) / num_nodes
+    root = Node()
+    nodes = [root]
+    for idx in range(num_nodes - 1):
+        # Give every node up to len(moves) children, breadth first.
+        parent = nodes[idx // len(moves)]
+        nodes.append(parent.AddChild(
+            m=moves[idx % len(moves)], playerJustMoved=1, isTalonClosed=False,
+            whoClosedTalon=None
+        ))
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # Do not count the list used to build the tree.
+    return (after - before - sys.getsizeof(nodes)) / num_nodes
+
+
+def _get_arguments():
+    """Get command line arguments for the benchmark."""
+    parser = argparse.ArgumentParser(description='Benchmark the ISMCTS search.')
+    parser.add_argument('-i', '--itermax', type=int, default=5000, help='Iterations per search.')
+    parser.add_argument('-r', '--repeats', type=int, default=3, help='Number of searches.')
+    parser.add_argument('-n', '--nodes', type=int, default=100000, help='Nodes for memory.')
+    parser.add_argument('-s', '--seed', type=int, default=1, help='The random seed.')
+    parser.add_argument(
+        '-t', '--tree', default='node', choices=sorted(TREE_TO_SEARCH_MAP),
+        help='Search tree representation.'
+    )
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    arguments = _get_arguments()
+    random.seed(arguments.seed)
+    print('Time per iteration: {:.1f} us'.format(
+        1e6 * time_per_iteration(arguments.itermax, arguments.repeats, arguments.tree)
+    ))
+    print('Memory per node: {:.0f} bytes'.format(memory_per_node(arguments.nodes, arguments.tree)))
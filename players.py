@@ -3,7 +3,18 @@ Classes representing computer and human players.
 
 Each player responds to the game state by making moves on their turn.
 """
-from ISMCTS import ISMCTS
+import multiprocessing
+import threading
+import time
+
+from ISMCTS import ISMCTS, ArrayISMCTS, Node, ParallelISMCTS, SearchTree, TreeParallelISMCTS
+from solver import EndgameSolver, GameSolver
+
+TREE_TO_SEARCH_MAP = {'node': ISMCTS, 'array': ArrayISMCTS}
+
+# The maximum number of nodes in the tree of a pondering search without max_nodes, as it
+# has no other budget and the other player may take a long time to move.
+PONDER_MAX_NODES = 200000
 
 
 class Player(object):
@@ -19,6 +30,18 @@ class Player(object):
         """Return a legal move in the game state (but do not make it)."""
         raise NotImplementedError
 
+    def ponder(self, state):
+        """Think about the game state while another player selects a move."""
+        pass
+
+    def stop_pondering(self):
+        """Stop thinking started by ponder."""
+        pass
+
+    def close(self):
+        """Release anything the player keeps between moves, at the end of a game."""
+        pass
+
     def survey_game_state(self, state):
         """Display all the information available to the player."""
         state_repr = state.__repr__()
@@ -27,8 +50,7 @@ class Player(object):
                 idx=idx + 1,
                 move=move,
                 winner=' (W)' if (
-                    state.currentTrick != [] and
-                    state.GetTrickWinner(state.currentTrick + [(self._id, move.card)]) == self._id
+                    state.currentTrick != [] and state.WinsCurrentTrick(move.card)
                 ) else ''
             )
             for idx, move in enumerate(state.GetMoves())
@@ -40,28 +62,197 @@ class Player(object):
 class ComputerPlayer(Player):
     """A player using the ISMCTS algorithm to make moves."""
 
-    def __init__(self, _id, itermax=3000, strategy='id', is_omniscient=False):
+    def __init__(
+            self, _id, itermax=3000, strategy='id', is_omniscient=False, tree='node', workers=1,
+            threads=1, rollouts=1, time_limit=None, max_nodes=None, early_stop=False,
+            confidence=None, reuse_tree=False, ponder=False, solve_endgames=False,
+            solve_time_limit=1.0
+    ):
         """
         Initialize an ISMCTS player.
 
         Parameters
         ----------
-        itermax: Number of iterations to perform ISMCTS.
+        itermax: Number of iterations to perform ISMCTS (in each worker process), or None
+            to search until the time or node budget runs out.
+        tree: Search tree representation, either 'node' (linked Node objects) or 'array'.
+        workers: Number of processes running root-parallel searches; 1 searches in-process.
+        threads: Number of threads sharing one search tree of Nodes in each search.
+        rollouts: Number of random games played from each new leaf (not with threads).
+        time_limit: Maximum number of seconds to search for each move.
+        max_nodes: Maximum number of nodes in each search tree (not with threads).
+        early_stop: Stop searching once no other move can become the most visited one.
+        confidence: Stop searching once the best move is ahead at this confidence level.
+            Both stopping rules only apply to single-process, single-thread searches.
+        reuse_tree: Keep the search tree between moves, continuing from the subtree of the
+            moves played since (only for single-process, single-thread 'node' searches).
+        ponder: Keep searching in a background thread during the other player's turns, and
+            reuse that tree (this implies reuse_tree). The search grows the tree to at most
+            max_nodes nodes, or PONDER_MAX_NODES without max_nodes.
+        solve_endgames: Solve the leaves of the search with a closed talon exactly instead of
+            playing random games from them (not with threads).
+        solve_time_limit: Maximum number of seconds an omniscient player spends solving the
+            game exactly for each move, before searching with ISMCTS instead. Both count
+            towards time_limit.
         """
         super(ComputerPlayer, self).__init__(_id=_id)
         self.itermax = itermax
         self.type = 'computer'
         self.is_omniscient = is_omniscient
         self.strategy = strategy
+        self.tree = tree
+        self.workers = workers
+        self.threads = threads
+        self.rollouts = rollouts
+        self.time_limit = time_limit
+        self.max_nodes = max_nodes
+        self.early_stop = early_stop
+        self.confidence = confidence
+        # The number of iterations searched and saved by early stopping, for the last move.
+        self.statistics = {}
+        self.reuse_tree = reuse_tree or ponder
+        self.pondering = ponder
+        # The background search and the event that stops it while pondering.
+        self.ponder_thread = None
+        self.ponder_stop = None
+        # The state, the number of moves made in it and the root node of the last search.
+        self.last_search = None
+        self.pool = None
+        # The endgame solver keeps its transposition table between moves.
+        self.solver = EndgameSolver() if solve_endgames else None
+        # Omniscient players know the whole game, so they first try to solve it.
+        self.game_solver = GameSolver() if is_omniscient else None
+        self.solve_time_limit = solve_time_limit
+
+    def _get_reusable_tree(self, state):
+        """
+        Return the subtree of the last search for the moves made in state since then.
+
+        Return a new root node if there is no such subtree.
+        """
+        if self.last_search is not None:
+            last_state, num_moves, node = self.last_search
+            history = state.GetMoveHistory()
+            if last_state is state and len(history) >= num_moves:
+                for move in history[num_moves:]:
+                    node = node.childByMove.get(move)
+                    if node is None:
+                        break
+                else:
+                    # Detach the subtree so the rest of the old tree can be freed.
+                    node.parentNode = None
+                    return node
+        return Node(strategy=self.strategy)
+
+    def ponder(self, state):
+        """
+        Search the game state from this player's point of view until select_move is called.
+
+        The search runs on a clone of the state in a background thread, so the state may
+        change meanwhile. It also stops once its tree has max_nodes (or PONDER_MAX_NODES)
+        nodes. The next select_move continues in the subtree of the moves made.
+        """
+        if not self.pondering or self.tree != 'node' or self.workers > 1 or self.threads > 1:
+            return
+        self.stop_pondering()
+        rootnode = self._get_reusable_tree(state)
+        self.last_search = (state, len(state.GetMoveHistory()), rootnode)
+        self.ponder_stop = threading.Event()
+        self.ponder_thread = threading.Thread(
+            target=SearchTree,
+            args=(state.Clone(), None),
+            kwargs={
+                'strategy': self.strategy,
+                'rollouts': self.rollouts,
+                'maxNodes': self.max_nodes or PONDER_MAX_NODES,
+                'rootnode': rootnode,
+                'observer': self._id,
+                'stop': self.ponder_stop,
+                'solver': self.solver
+            }
+        )
+        self.ponder_thread.daemon = True
+        self.ponder_thread.start()
+
+    def stop_pondering(self):
+        """Stop the background search started by ponder and wait for it to finish."""
+        if self.ponder_thread is not None:
+            self.ponder_stop.set()
+            self.ponder_thread.join()
+            self.ponder_thread = None
+            self.ponder_stop = None
+
+    def close(self):
+        """Stop pondering and shut down the worker processes kept between moves."""
+        self.stop_pondering()
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
 
     def select_move(self, state, verbose=False):
         """Return a legal move in the game state (but do not make it)."""
-        return ISMCTS(
+        self.stop_pondering()
+        time_limit = self.time_limit
+        if self.game_solver is not None:
+            # Solving counts towards the time limit, and the search gets only the time left.
+            start = time.monotonic()
+            solve_time_limit = self.solve_time_limit
+            if time_limit is not None:
+                solve_time_limit = min(solve_time_limit, time_limit)
+            move = self.game_solver.SolveWithin(state, solve_time_limit)
+            if move is not None:
+                if verbose:
+                    print('Solved the game exactly.')
+                return move
+            if time_limit is not None:
+                time_limit = max(time_limit - (time.monotonic() - start), 0)
+        if self.workers > 1:
+            # Keep the worker processes for the following moves.
+            if self.pool is None:
+                self.pool = multiprocessing.Pool(self.workers)
+            return ParallelISMCTS(
+                rootstate=state,
+                itermax=self.itermax,
+                strategy=self.strategy,
+                verbose=verbose,
+                workers=self.workers,
+                pool=self.pool,
+                tree=self.tree,
+                rollouts=self.rollouts,
+                timeLimit=time_limit,
+                maxNodes=self.max_nodes,
+                solver=self.solver
+            )
+        if self.threads > 1:
+            return TreeParallelISMCTS(
+                rootstate=state,
+                itermax=self.itermax,
+                strategy=self.strategy,
+                verbose=verbose,
+                threads=self.threads,
+                timeLimit=time_limit
+            )
+        options = {}
+        if self.reuse_tree and self.tree == 'node':
+            options['rootnode'] = self._get_reusable_tree(state)
+        move = TREE_TO_SEARCH_MAP[self.tree](
             rootstate=state,
             itermax=self.itermax,
             strategy=self.strategy,
-            verbose=verbose
+            verbose=verbose,
+            rollouts=self.rollouts,
+            timeLimit=time_limit,
+            maxNodes=self.max_nodes,
+            earlyStop=self.early_stop,
+            confidence=self.confidence,
+            statistics=self.statistics,
+            solver=self.solver,
+            **options
         )
+        if 'rootnode' in options:
+            self.last_search = (state, len(state.GetMoveHistory()), options['rootnode'])
+        return move
 
 
 class HumanPlayer(Player):
@@ -20,8 +20,14 @@ class Card(object):
 
     rank must be an integer between 10 and 14 inclusive (Jack=11, Queen=12, King=13, Ace=14).
     suit must be a string of length 1, one of 'C', 'D', 'H', 'S'.
+
+    Cards are interned: Card(rank, suit) returns one of the 20 instances in FULL_DECK,
+    so two cards are equal exactly when they are the same object.
+    Each card carries its index in FULL_DECK as id, its score and its marriage partner.
     """
 
+    __slots__ = ('rank', 'suit', 'id', 'score', 'marriage_partner')
+
     RANK_TO_SCORE_MAP = {
         10: 10,
         11: 2,
@@ -32,42 +38,157 @@ class Card(object):
 
     RANK_TO_REPR_MAP = dict(enumerate('??23456789TJQKA'))
 
-    def __init__(self, rank, suit):
-        """Initialize a playing card of the given rank and suit."""
-        self.rank = rank
-        self.suit = suit
-        self.score = self.RANK_TO_SCORE_MAP[self.rank]
+    def __new__(cls, rank, suit):
+        """Return the playing card of the given rank and suit."""
+        return CARDS_BY_RANK_AND_SUIT[(rank, suit)]
+
+    @classmethod
+    def _create(cls, rank, suit, _id):
+        """Create the unique card of the given rank and suit."""
+        card = object.__new__(cls)
+        card.rank = rank
+        card.suit = suit
+        card.id = _id
+        card.score = cls.RANK_TO_SCORE_MAP[rank]
+        card.marriage_partner = None
+        return card
 
     def get_marriage_partner(self):
-        """Return another card representing the marriage partner."""
-        if self.rank not in {12, 13}:
-            return None
-        else:
-            # Return 13 if the current card is rank 12 and 12 if it is 13.
-            return Card(rank=12 + (self.rank == 12), suit=self.suit)
+        """Return the card representing the marriage partner, if any."""
+        return self.marriage_partner
 
     def __repr__(self):
         """Represent a card as a string."""
         return self.RANK_TO_REPR_MAP[self.rank] + SUIT_TO_UNICODE_MAP[self.suit]
 
-    def __hash__(self):
-        """A card's representation is an immutable, unique identifier."""
-        return hash((self.suit, self.rank))
-
-    def __eq__(self, other):
-        """Two cards are equal if they are equal in rank and suit."""
-        return (self.suit, self.rank) == (other.suit, other.rank)
+    def __reduce__(self):
+        """Unpickle a card as the interned card of the same rank and suit."""
+        return (Card, (self.rank, self.suit))
 
     def __copy__(self):
-        """Create a copy of the given card."""
-        return Card(rank=self.rank, suit=self.suit)
+        """Cards are immutable, so a copy is the card itself."""
+        return self
 
     def __deepcopy__(self, memo):
-        """Create a deep copy of the given card."""
-        return Card(rank=self.rank, suit=self.suit)
+        """Cards are immutable, so a deep copy is the card itself."""
+        return self
+
+
+SUITS = ['C', 'D', 'H', 'S']
+
+FULL_DECK = [
+    Card._create(rank, suit, _id)
+    for _id, (rank, suit) in enumerate(
+        (rank, suit) for rank in range(10, 14 + 1) for suit in SUITS
+    )
+]
+CARDS_BY_RANK_AND_SUIT = {(card.rank, card.suit): card for card in FULL_DECK}
+CARDS_BY_SUIT = {suit: [card for card in FULL_DECK if card.suit == suit] for suit in SUITS}
+for card in FULL_DECK:
+    if card.rank in {12, 13}:
+        # The queen's partner is the king and vice versa.
+        card.marriage_partner = CARDS_BY_RANK_AND_SUIT[(25 - card.rank, card.suit)]
+del card
+
+# Card sets of the bitmask engine are integers whose bit i stands for the card with id i.
+FULL_DECK_MASK = (1 << len(FULL_DECK)) - 1
+CARD_SCORES = [card.score for card in FULL_DECK]
+SUIT_MASKS = {
+    suit: sum(1 << card.id for card in CARDS_BY_SUIT[suit]) for suit in SUITS
+}
+# The mask of the suit of each card, indexed by card id.
+CARD_SUIT_MASKS = [SUIT_MASKS[card.suit] for card in FULL_DECK]
+# Cards of the same suit that beat each card, indexed by card id.
+HIGHER_CARD_MASKS = [
+    sum(1 << other.id for other in CARDS_BY_SUIT[card.suit] if other.score > card.score)
+    for card in FULL_DECK
+]
+MARRIAGE_PARTNER_INDEX = [
+    card.marriage_partner.id if card.marriage_partner else None for card in FULL_DECK
+]
+# The mask of the king and queen of each suit.
+MARRIAGE_MASKS = [
+    (1 << Card(12, suit).id) | (1 << Card(13, suit).id) for suit in SUITS
+]
+
+
+def iter_mask(mask):
+    """Yield the ids of the cards in a card mask, in ascending order."""
+    while mask:
+        low_bit = mask & -mask
+        yield low_bit.bit_length() - 1
+        mask ^= low_bit
+
+
+def cards_to_mask(cards):
+    """Convert an iterable of cards to a card mask."""
+    mask = 0
+    for card in cards:
+        mask |= 1 << card.id
+    return mask
+
+
+def mask_to_cards(mask):
+    """Convert a card mask to a list of cards."""
+    return [FULL_DECK[idx] for idx in iter_mask(mask)]
+
 
+def count_cards(mask):
+    """Return the number of cards in a card mask."""
+    return bin(mask).count('1')
 
-FULL_DECK = [Card(rank, suit) for rank in range(10, 14 + 1) for suit in ['C', 'D', 'H', 'S']]
+
+def count_points(mask):
+    """Return the total score of the cards in a card mask."""
+    return LOW_CARD_POINTS[mask & 0x3ff] + HIGH_CARD_POINTS[mask >> 10]
+
+
+# The scores of the cards in each mask of the ten lowest and the ten highest card ids.
+LOW_CARD_POINTS = [sum(CARD_SCORES[idx] for idx in iter_mask(mask)) for mask in range(1024)]
+HIGH_CARD_POINTS = [
+    sum(CARD_SCORES[idx] for idx in iter_mask(mask << 10)) for mask in range(1024)
+]
+
+
+def get_trick_winner_by_sorting(completed_trick, trump_suit):
+    """
+    Determine the winner of a completed trick by sorting its plays.
+
+    This is the reference implementation behind TRICK_WINNER_TABLE.
+
+    Sort the plays in the trick:
+    First, those that followed suit (in ascending rank order).
+    Then, any trump plays (also in ascending rank order).
+    The winning play is the last element in sortedPlays.
+    """
+    (leader, leadCard) = completed_trick[0]
+    suited_plays = [
+        (player, card.score)
+        for (player, card) in completed_trick
+        if card.suit == leadCard.suit
+    ]
+    trump_plays = [
+        (player, card.score)
+        for (player, card) in completed_trick
+        if card.suit == trump_suit
+    ]
+    sorted_plays = sorted(
+        suited_plays, key=lambda player_score: player_score[1]
+    ) + sorted(trump_plays, key=lambda player_score: player_score[1])
+    return sorted_plays[-1][0]
+
+
+NUM_CARDS = len(FULL_DECK)
+
+# For each trump suit, entry (lead.id * NUM_CARDS + follow.id) is 1 if the follower wins.
+TRICK_WINNER_TABLE = {
+    trump_suit: bytes(
+        get_trick_winner_by_sorting([(1, leadCard), (2, followCard)], trump_suit) == 2
+        for leadCard in FULL_DECK
+        for followCard in FULL_DECK
+    )
+    for trump_suit in SUITS
+}
 
 
 class SchnapsenMove(object):
@@ -75,17 +196,32 @@ class SchnapsenMove(object):
     Represents a single move in a game of Schnapsen.
 
     A move consists of a decision to close the talon or not and a card to play.
+
+    Moves are interned: SchnapsenMove(...) returns one of the instances in MOVE_TABLE.
+    Each move has a code, card.id * 2 + close_talon, which identifies it in the search tree.
+    The marriage points follow from the state, so they do not contribute to the code.
     """
 
-    def __init__(self, card, close_talon=False, marriage_points=None):
-        """
-        Initialize a move.
+    __slots__ = ('card', 'close_talon', 'marriage_points', 'code')
 
-        A move consists of a card, closing or not, and the number of marriage points.
-        """
-        self.card = card
-        self.close_talon = close_talon
-        self.marriage_points = marriage_points
+    MARRIAGE_POINTS_TO_INDEX_MAP = {None: 0, 20: 1, 40: 2}
+
+    def __new__(cls, card, close_talon=False, marriage_points=None):
+        """Return the move with the given card, closing decision and marriage points."""
+        return MOVE_TABLE[
+            6 * card.id + 3 * bool(close_talon) +
+            cls.MARRIAGE_POINTS_TO_INDEX_MAP[marriage_points]
+        ]
+
+    @classmethod
+    def _create(cls, card, close_talon, marriage_points):
+        """Create the unique move with the given card, closing decision and marriage points."""
+        move = object.__new__(cls)
+        move.card = card
+        move.close_talon = close_talon
+        move.marriage_points = marriage_points
+        move.code = 2 * card.id + close_talon
+        return move
 
     def __repr__(self):
         """Represent a move as a string."""
@@ -101,18 +237,139 @@ class SchnapsenMove(object):
 
     def __eq__(self, other):
         """Two moves are equal if they are the same card and both close the talon or not."""
-        return (self.close_talon, self.card) == (other.close_talon, other.card)
+        return self.code == other.code
+
+    def __ne__(self, other):
+        """Two moves differ if their cards or closing decisions differ."""
+        return self.code != other.code
 
     def __hash__(self):
-        """A move's representation is an immutable, unique identifier."""
-        return hash((self.close_talon, self.card))
+        """A move's code is an immutable, unique identifier."""
+        return self.code
+
+    def __reduce__(self):
+        """Unpickle a move as the interned move with the same attributes."""
+        return (SchnapsenMove, (self.card, self.close_talon, self.marriage_points))
+
+    def __copy__(self):
+        """Moves are immutable, so a copy is the move itself."""
+        return self
+
+    def __deepcopy__(self, memo):
+        """Moves are immutable, so a deep copy is the move itself."""
+        return self
+
+
+# Every possible move, indexed by 6 * card.id + 3 * close_talon + marriage points index.
+MOVE_TABLE = [
+    SchnapsenMove._create(card, close_talon, marriage_points)
+    for card in FULL_DECK
+    for close_talon in (False, True)
+    for marriage_points in (None, 20, 40)
+]
+NUM_MOVE_CODES = 2 * NUM_CARDS
+
+
+def _zobrist_keys(rng, n):
+    """Draw n random 64-bit Zobrist keys."""
+    return [rng.getrandbits(64) for _ in range(n)]
+
+
+# Zobrist keys use their own fixed-seed generator, so hashes do not depend on game seeds.
+_ZOBRIST_RANDOM = random.Random(66)
+ZOBRIST_HAND = {p: _zobrist_keys(_ZOBRIST_RANDOM, NUM_CARDS) for p in (1, 2)}
+ZOBRIST_REVEALED = {p: _zobrist_keys(_ZOBRIST_RANDOM, NUM_CARDS) for p in (1, 2)}
+ZOBRIST_EMPTY_SUIT = {p: dict(zip(SUITS, _zobrist_keys(_ZOBRIST_RANDOM, 4))) for p in (1, 2)}
+ZOBRIST_TRICK = _zobrist_keys(_ZOBRIST_RANDOM, NUM_CARDS)
+ZOBRIST_DISCARD = _zobrist_keys(_ZOBRIST_RANDOM, NUM_CARDS)
+ZOBRIST_FACE_UP = _zobrist_keys(_ZOBRIST_RANDOM, NUM_CARDS)
+# Talon keys are indexed by the position counted from the bottom, then by card id.
+ZOBRIST_TALON = [_zobrist_keys(_ZOBRIST_RANDOM, NUM_CARDS) for _ in range(NUM_CARDS)]
+ZOBRIST_TALON_SIZE = _zobrist_keys(_ZOBRIST_RANDOM, NUM_CARDS + 1)
+ZOBRIST_POINTS = {p: _zobrist_keys(_ZOBRIST_RANDOM, 256) for p in (1, 2)}
+ZOBRIST_STAKES = {p: _zobrist_keys(_ZOBRIST_RANDOM, 4) for p in (1, 2)}
+ZOBRIST_TO_MOVE = {p: _ZOBRIST_RANDOM.getrandbits(64) for p in (1, 2)}
+ZOBRIST_WHO_CLOSED = {p: _ZOBRIST_RANDOM.getrandbits(64) for p in (1, 2)}
+ZOBRIST_WINNER = {p: _ZOBRIST_RANDOM.getrandbits(64) for p in (1, 2)}
+ZOBRIST_TALON_CLOSED = _ZOBRIST_RANDOM.getrandbits(64)
+
+
+def zobrist_scalar_key(state):
+    """Combine the Zobrist keys of the scalar, publicly known fields of a game state."""
+    key = (
+        ZOBRIST_TO_MOVE[state.playerToMove] ^
+        ZOBRIST_TALON_SIZE[len(state.talon) - state.talonIndex]
+    )
+    for p in state.players:
+        key ^= ZOBRIST_POINTS[p][state.pointsTaken[p]]
+        key ^= ZOBRIST_STAKES[p][int(state.gamePointsAtStake[p])]
+    if state.isTalonClosed:
+        key ^= ZOBRIST_TALON_CLOSED
+    if state.whoClosedTalon is not None:
+        key ^= ZOBRIST_WHO_CLOSED[state.whoClosedTalon]
+    if state.winner is not None:
+        key ^= ZOBRIST_WINNER[state.winner]
+    return key
+
+
+def compute_zobrist_hashes(state):
+    """
+    Compute the Zobrist hashes of a game state from scratch.
+
+    Returns (publicHash, talonHash, handHashes): the hash of everything both players know,
+    the hash of the hidden talon order and a dictionary of the hashes of each hand.
+    """
+    publicHash = zobrist_scalar_key(state) ^ ZOBRIST_FACE_UP[state.faceUpCard.id]
+    for (_, card) in state.currentTrick:
+        publicHash ^= ZOBRIST_TRICK[card.id]
+    for card in state.discards:
+        publicHash ^= ZOBRIST_DISCARD[card.id]
+    for p in state.players:
+        for card in state.marriageCardsRevealed[p]:
+            publicHash ^= ZOBRIST_REVEALED[p][card.id]
+        for suit in state.knownEmptySuits[p]:
+            publicHash ^= ZOBRIST_EMPTY_SUIT[p][suit]
+
+    talonHash = 0
+    for (position, card) in enumerate(reversed(state.deck)):
+        talonHash ^= ZOBRIST_TALON[position][card.id]
+
+    handHashes = {}
+    for p in state.players:
+        handHashes[p] = 0
+        for card in state.playerHands[p]:
+            handHashes[p] ^= ZOBRIST_HAND[p][card.id]
+
+    return (publicHash, talonHash, handHashes)
 
 
 class SchnapsenGameState(GameState):
-    """A state of the game Schnapsen."""
+    """
+    A state of the game Schnapsen.
+
+    Clones share their containers (hands, revealed marriage cards, known empty suits,
+    discards, the current trick and points taken) with the state they were cloned from.
+    A state copies a shared container the first time it changes it, so code outside
+    this class must replace these containers rather than mutate them in place.
+
+    DoMove keeps Zobrist hashes of the state up to date: publicHash covers everything
+    both players know, handHashes covers each hand and talonHash covers the talon order.
+    """
+
+    # How to copy each container that clones share until one of them changes it.
+    _COPY_ON_WRITE = {
+        'playerHands': lambda hands: {p: list(hand) for p, hand in hands.items()},
+        'marriageCardsRevealed': lambda cards: {p: set(c) for p, c in cards.items()},
+        'knownEmptySuits': lambda suits: {p: set(s) for p, s in suits.items()},
+        'discards': list,
+        'currentTrick': list,
+        'pointsTaken': dict,
+        'handHashes': dict,
+    }
 
     def __init__(self, omniscient_players=set()):
         """Initialize the game state."""
+        self.sharedContainers = set()
         self.numberOfPlayers = 2
         self.players = [1, 2]
         self.playerHands = {p: [] for p in self.players}
@@ -128,40 +385,60 @@ class SchnapsenGameState(GameState):
         self.Deal()
 
     def Clone(self):
-        """Create a deep clone of this game state."""
-        st = SchnapsenGameState(omniscient_players=self.omniscient_players)
+        """
+        Create a deep clone of this game state.
+
+        Containers are shared with the clone and copied on write by whichever state
+        changes them first. The clone starts with an empty undo stack.
+        """
+        st = object.__new__(SchnapsenGameState)
         st.players = self.players
         st.numberOfPlayers = self.numberOfPlayers
+        st.omniscient_players = self.omniscient_players
         st.playerToMove = self.playerToMove
-        st.playerHands = {p: [card for card in self.playerHands[p]] for p in self.players}
-        st.marriageCardsRevealed = {
-            p: {card for card in self.marriageCardsRevealed[p]} for p in self.players
-        }
-        st.knownEmptySuits = {
-            p: {suit for suit in self.knownEmptySuits[p]} for p in self.players
-        }
-        st.discards = [card for card in self.discards]
-        st.currentTrick = [card for card in self.currentTrick]
+        st.playerHands = self.playerHands
+        st.marriageCardsRevealed = self.marriageCardsRevealed
+        st.knownEmptySuits = self.knownEmptySuits
+        st.discards = self.discards
+        st.currentTrick = self.currentTrick
         st.trumpSuit = self.trumpSuit
         st.faceUpCard = self.faceUpCard
-        st.pointsTaken = {p: self.pointsTaken[p] for p in self.players}
+        st.pointsTaken = self.pointsTaken
         st.isTalonClosed = self.isTalonClosed
         st.whoClosedTalon = self.whoClosedTalon
         st.gamePointsAtStake = self.gamePointsAtStake
-        st.deck = [card for card in self.deck]
+        st.talon = self.talon
+        st.talonIndex = self.talonIndex
         st.winner = self.winner
+        st.publicHash = self.publicHash
+        st.talonHash = self.talonHash
+        st.handHashes = self.handHashes
+        st.undoStack = []
+        st.cachedMoves = self.cachedMoves
+        self.sharedContainers = set(self._COPY_ON_WRITE)
+        st.sharedContainers = set(self._COPY_ON_WRITE)
         return st
 
-    def CloneAndRandomize(self, observer):
+    def _Unshare(self, name):
+        """Copy the named container if it is shared with a clone, before changing it."""
+        if name in self.sharedContainers:
+            self.sharedContainers.remove(name)
+            setattr(self, name, self._COPY_ON_WRITE[name](getattr(self, name)))
+
+    def CloneAndRandomize(self, observer, rng=random):
         """
         Create a deep clone of this game state.
 
-        All information not visible to the specified observer player is randomized.
+        All information not visible to the specified observer player is randomized, with
+        the random generator rng.
         """
         st = self.Clone()
         # If the observer is omniscient, do not randomize.
         if observer in self.omniscient_players:
             return st
+        # Only the observer's own legal moves are unaffected by randomization.
+        if observer != st.playerToMove:
+            st.cachedMoves = None
 
         other_player = self.GetNextPlayer(observer)
         # The observer can see its own hand and the cards in the current trick.
@@ -174,11 +451,13 @@ class SchnapsenGameState(GameState):
         # The observer also knows about all declared marriages.
         seenCards.update(st.marriageCardsRevealed[other_player])
         # The observer also knows about any empty suits the other player has.
-        seenCards.update(
-            Card(rank=rank, suit=suit)
-            for suit in st.knownEmptySuits[other_player]
-            for rank in range(10, 14)
-        )
+        # Unseen cards of those suits must be in the (closed) talon.
+        emptySuitCards = [
+            card for suit in SUITS if suit in st.knownEmptySuits[other_player]
+            for card in CARDS_BY_SUIT[suit]
+        ]
+        talonOnlyCards = [card for card in emptySuitCards if card not in seenCards]
+        seenCards.update(emptySuitCards)
 
         # The observer can't see the rest of the deck.
         unseenCards = [card for card in st.GetCardDeck() if card not in seenCards]
@@ -186,26 +465,36 @@ class SchnapsenGameState(GameState):
         assert(len(unseenCards) + len(seenCards) == len(st.GetCardDeck()))
 
         # Deal the unseen cards to the other player.
-        random.shuffle(unseenCards)
+        rng.shuffle(unseenCards)
 
         # Deal cards to player p, accounting for revealed marriages.
         playerHand = [card for card in st.marriageCardsRevealed[other_player]]
-        # If the deck is empty, someone must have the face-up card.
-        if len(st.deck) == 0 and st.faceUpCard not in st.playerHands[observer]:
+        # If the talon is empty, someone must have the face-up card.
+        if st.talonIndex == len(st.talon) and st.faceUpCard not in st.playerHands[observer]:
             # If the observer doesn't have it and it hasn't been played yet,
             # the other player must have it.
-            if st.faceUpCard not in (st.discards + currentTrickCards):
+            if st.faceUpCard not in (st.discards + currentTrickCards + playerHand):
                 playerHand.append(st.faceUpCard)
         numCardsToDeal = len(st.playerHands[other_player]) - len(playerHand)
         playerHand += unseenCards[:numCardsToDeal]
+        st._Unshare('playerHands')
         st.playerHands[other_player] = [card for card in playerHand]
-        # Remove those cards from unseenCards.
-        unseenCards = unseenCards[numCardsToDeal:]
 
-        st.deck = unseenCards
-        # If there are cards left in the deck, the face-up card is on the bottom.
-        if len(st.deck) != 0:
-            st.deck += [st.faceUpCard]
+        # The rest of the unseen cards form the talon.
+        st.talon = unseenCards + talonOnlyCards
+        st.talonIndex = numCardsToDeal
+        # If there are cards left in the talon, the face-up card is on the bottom.
+        if st.talonIndex != len(st.talon):
+            st.talon.append(st.faceUpCard)
+
+        # Only the hidden hand and the talon order changed, so only their hashes change.
+        st._Unshare('handHashes')
+        st.handHashes[other_player] = 0
+        for card in st.playerHands[other_player]:
+            st.handHashes[other_player] ^= ZOBRIST_HAND[other_player][card.id]
+        st.talonHash = 0
+        for (position, card) in enumerate(reversed(st.deck)):
+            st.talonHash ^= ZOBRIST_TALON[position][card.id]
 
         return st
 
@@ -218,19 +507,39 @@ class SchnapsenGameState(GameState):
         self.discards = []
         self.currentTrick = []
         self.pointsTaken = {p: 0 for p in self.players}
+        self.undoStack = []
+        self.cachedMoves = None
+        self.sharedContainers.difference_update(('discards', 'currentTrick', 'pointsTaken'))
+        self._Unshare('playerHands')
 
         # Construct a deck, shuffle it, and deal it to the players.
         deck = self.GetCardDeck()
         random.shuffle(deck)
-        for p in self.players:
-            self.playerHands[p] = deck[: 5]
-            deck = deck[5:]
+        for idx, p in enumerate(self.players):
+            self.playerHands[p] = deck[5 * idx: 5 * (idx + 1)]
 
-        # Set the remaining cards to draw.
-        self.deck = deck
+        # The remaining cards form the talon, read from talonIndex on.
+        self.talon = deck
+        self.talonIndex = 5 * len(self.players)
         # Choose the trump suit for this round.
-        self.faceUpCard = self.deck[-1]
+        self.faceUpCard = self.talon[-1]
         self.trumpSuit = self.faceUpCard.suit
+        self.ComputeHashes()
+
+    def ComputeHashes(self):
+        """Recompute the Zobrist hashes of this game state from scratch."""
+        (self.publicHash, self.talonHash, self.handHashes) = compute_zobrist_hashes(self)
+        self.sharedContainers.discard('handHashes')
+
+    def GetStateHash(self):
+        """Return a 64-bit Zobrist hash of the full (determinized) game state."""
+        return self.publicHash ^ self.talonHash ^ self.handHashes[1] ^ self.handHashes[2]
+
+    def GetInfoSetHash(self, observer):
+        """Return a 64-bit Zobrist hash of the information set of the given observer."""
+        if observer in self.omniscient_players:
+            return self.GetStateHash()
+        return self.publicHash ^ self.handHashes[observer]
 
     def GetNextPlayer(self, p):
         """Return the player to the left of the specified player."""
@@ -241,6 +550,62 @@ class SchnapsenGameState(GameState):
         Update a state by carrying out the given move.
 
         Must update playerToMove.
+        The move is recorded on the undo stack so that UndoMove can revert it.
+        """
+        self.cachedMoves = None
+
+        # Record everything this move may change before changing it.
+        revealed = self.marriageCardsRevealed[self.playerToMove]
+        self.undoStack.append((
+            move,
+            self.playerToMove,
+            self.playerHands[self.playerToMove].index(move.card),
+            move.card in revealed,
+            move.card.get_marriage_partner() in revealed,
+            set(self.knownEmptySuits[self.playerToMove]),
+            self.currentTrick,
+            len(self.currentTrick),
+            len(self.discards),
+            self.talonIndex,
+            dict(self.pointsTaken),
+            self.gamePointsAtStake,
+            self.isTalonClosed,
+            self.whoClosedTalon,
+            self.winner,
+            self.publicHash,
+            self.talonHash,
+            self.handHashes[1],
+            self.handHashes[2],
+        ))
+
+        player = self.playerToMove
+        self._ApplyMove(move)
+        if self.playerToMove != player:
+            self.publicHash ^= ZOBRIST_TO_MOVE[player] ^ ZOBRIST_TO_MOVE[self.playerToMove]
+        if self.winner is not None:
+            self.publicHash ^= ZOBRIST_WINNER[self.winner]
+
+    def _SetGamePointsAtStake(self, gamePointsAtStake):
+        """Replace the game points at stake, updating their Zobrist keys if they change."""
+        if gamePointsAtStake != self.gamePointsAtStake:
+            for p in self.players:
+                self.publicHash ^= (
+                    ZOBRIST_STAKES[p][int(self.gamePointsAtStake[p])] ^
+                    ZOBRIST_STAKES[p][int(gamePointsAtStake[p])]
+                )
+        self.gamePointsAtStake = gamePointsAtStake
+
+    def _AddPoints(self, player, points):
+        """Add to the points taken by player, updating their Zobrist key."""
+        self.publicHash ^= ZOBRIST_POINTS[player][self.pointsTaken[player]]
+        self.pointsTaken[player] += points
+        self.publicHash ^= ZOBRIST_POINTS[player][self.pointsTaken[player]]
+
+    def _ApplyMove(self, move):
+        """
+        Carry out the given move, updating the Zobrist hashes.
+
+        DoMove updates the keys of the player to move and the winner afterwards.
         """
         other_player = (self.playerToMove % 2) + 1
 
@@ -251,15 +616,16 @@ class SchnapsenGameState(GameState):
             game_points_if_other_player_wins = 3.0 - math.ceil(
                 self.pointsTaken[self.playerToMove] / 33
             )
-            self.gamePointsAtStake = {
+            self._SetGamePointsAtStake({
                 self.playerToMove: game_points_if_current_player_wins,
                 other_player: game_points_if_other_player_wins
-            }
+            })
 
         # Close the talon if part of the current SchnapsenMove.
         if move.close_talon:
             self.isTalonClosed = True
             self.whoClosedTalon = self.playerToMove
+            self.publicHash ^= ZOBRIST_TALON_CLOSED ^ ZOBRIST_WHO_CLOSED[self.playerToMove]
             # FIXME: Account for marriages.
             game_points_if_closer_wins = 3.0 - math.ceil(self.pointsTaken[other_player] / 33)
             game_points_if_closer_loses = {
@@ -267,17 +633,20 @@ class SchnapsenGameState(GameState):
                 2.0: 2.0,
                 1.0: 2.0
             }[game_points_if_closer_wins]
-            self.gamePointsAtStake = {
+            self._SetGamePointsAtStake({
                 self.playerToMove: game_points_if_closer_wins,
                 other_player: game_points_if_closer_loses
-            }
+            })
 
         # Check for marriages, updating known information about the game state.
         if move.marriage_points is not None:
-            self.pointsTaken[self.playerToMove] += move.marriage_points
-            self.marriageCardsRevealed[self.playerToMove].add(
-                move.card.get_marriage_partner()
-            )
+            self._Unshare('pointsTaken')
+            self._Unshare('marriageCardsRevealed')
+            self._AddPoints(self.playerToMove, move.marriage_points)
+            marriage_partner = move.card.get_marriage_partner()
+            if marriage_partner not in self.marriageCardsRevealed[self.playerToMove]:
+                self.publicHash ^= ZOBRIST_REVEALED[self.playerToMove][marriage_partner.id]
+            self.marriageCardsRevealed[self.playerToMove].add(marriage_partner)
             # THIS BREAKS THINGS.
             # # Remove the marriage partner from the deck if possible.
             # if move.card.get_marriage_partner() in self.deck:
@@ -288,24 +657,36 @@ class SchnapsenGameState(GameState):
                 self.winner = self.playerToMove
                 return
 
+        self._Unshare('currentTrick')
+        self._Unshare('playerHands')
+        self._Unshare('handHashes')
         # Store the played card in the current trick.
         self.currentTrick.append((self.playerToMove, move.card))
+        self.publicHash ^= ZOBRIST_TRICK[move.card.id]
         # Remove the card from the player's hand.
         self.playerHands[self.playerToMove].remove(move.card)
+        self.handHashes[self.playerToMove] ^= ZOBRIST_HAND[self.playerToMove][move.card.id]
 
         # If applicable, remove the card from the current player's revealed marriage cards.
         if move.card in self.marriageCardsRevealed[self.playerToMove]:
+            self._Unshare('marriageCardsRevealed')
             self.marriageCardsRevealed[self.playerToMove].remove(move.card)
+            self.publicHash ^= ZOBRIST_REVEALED[self.playerToMove][move.card.id]
 
         # If the talon is closed and the current trick is over, record empty suits.
         if self.isTalonClosed and len(self.currentTrick) == 2:
             suits = [card.suit for _, card in self.currentTrick]
             # If the suits were different, the second player must be missing the lead suit.
             if suits[0] != suits[1]:
-                self.knownEmptySuits[self.playerToMove].add(suits[0])
+                self._Unshare('knownEmptySuits')
+                emptySuits = self.knownEmptySuits[self.playerToMove]
+                newEmptySuits = {suits[0]}
                 # If additionally neither suit was trump, the second player is out of trump.
                 if (suits[0] != self.trumpSuit) and (suits[1] != self.trumpSuit):
-                    self.knownEmptySuits[self.playerToMove].add(self.trumpSuit)
+                    newEmptySuits.add(self.trumpSuit)
+                for suit in newEmptySuits - emptySuits:
+                    self.publicHash ^= ZOBRIST_EMPTY_SUIT[self.playerToMove][suit]
+                emptySuits.update(newEmptySuits)
 
         # Find the next player.
         self.playerToMove = self.GetNextPlayer(self.playerToMove)
@@ -316,21 +697,32 @@ class SchnapsenGameState(GameState):
             trick_winner = self.GetTrickWinner(self.currentTrick)
 
             # Update the game state.
-            self.pointsTaken[trick_winner] += sum(card.score for _, card in self.currentTrick)
+            self._Unshare('pointsTaken')
+            self._Unshare('discards')
+            self._AddPoints(trick_winner, sum(card.score for _, card in self.currentTrick))
             self.discards += [card for _, card in self.currentTrick]
+            for (_, card) in self.currentTrick:
+                self.publicHash ^= ZOBRIST_TRICK[card.id] ^ ZOBRIST_DISCARD[card.id]
             self.currentTrick = []
             self.playerToMove = trick_winner
 
             # Both players draw from deck if applicable.
             if not self.isTalonClosed:
-                # Winner takes the top card.
-                self.playerHands[trick_winner] += [self.deck[0]]
-                # Other player takes the next card.
-                self.playerHands[self.GetNextPlayer(trick_winner)] += [self.deck[1]]
-                self.deck = self.deck[2:]
+                self.publicHash ^= (
+                    ZOBRIST_TALON_SIZE[len(self.talon) - self.talonIndex] ^
+                    ZOBRIST_TALON_SIZE[len(self.talon) - self.talonIndex - 2]
+                )
+                # Winner takes the top card, the other player takes the next card.
+                for p in (trick_winner, self.GetNextPlayer(trick_winner)):
+                    card = self.talon[self.talonIndex]
+                    self.playerHands[p].append(card)
+                    self.handHashes[p] ^= ZOBRIST_HAND[p][card.id]
+                    self.talonHash ^= ZOBRIST_TALON[len(self.talon) - 1 - self.talonIndex][card.id]
+                    self.talonIndex += 1
                 # Close the talon if no cards remain.
-                if not self.deck:
+                if self.talonIndex == len(self.talon):
                     self.isTalonClosed = True
+                    self.publicHash ^= ZOBRIST_TALON_CLOSED
             else:
                 # Determine winner when no one has any cards left.
                 # Only applicable when the talon is closed.
@@ -341,7 +733,7 @@ class SchnapsenGameState(GameState):
                             self.winner = (self.whoClosedTalon % 2) + 1
                             return
                         # If deck is empty and no one has 66 points, current player wins.
-                        elif len(self.deck) == 0:
+                        elif self.talonIndex == len(self.talon):
                             self.winner = trick_winner
                             return
 
@@ -349,35 +741,97 @@ class SchnapsenGameState(GameState):
             if self.pointsTaken[trick_winner] >= 66:
                 self.winner = trick_winner
 
+    def UndoMove(self):
+        """
+        Revert the most recent move made with DoMove on this game state.
+
+        Moves made before the state was cloned cannot be undone on the clone.
+        """
+        (
+            move, player, handIndex, wasCardRevealed, wasPartnerRevealed, knownEmptySuits,
+            currentTrick, numTrickCards, numDiscards, talonIndex, pointsTaken, gamePointsAtStake,
+            isTalonClosed, whoClosedTalon, winner, publicHash, talonHash, handHash1, handHash2
+        ) = self.undoStack.pop()
+        self.cachedMoves = None
+
+        # Return any cards drawn from the talon.
+        self._Unshare('playerHands')
+        if self.talonIndex != talonIndex:
+            for p in self.players:
+                self.playerHands[p].pop()
+            self.talonIndex = talonIndex
+        # Take the card back, unless a winning marriage ended the game before it was played.
+        if move.card not in self.playerHands[player]:
+            self.playerHands[player].insert(handIndex, move.card)
+        self.currentTrick = currentTrick[:numTrickCards]
+        self.sharedContainers.discard('currentTrick')
+        self._Unshare('discards')
+        del self.discards[numDiscards:]
+
+        self._Unshare('marriageCardsRevealed')
+        revealed = self.marriageCardsRevealed[player]
+        if wasCardRevealed:
+            revealed.add(move.card)
+        if move.marriage_points is not None and not wasPartnerRevealed:
+            revealed.discard(move.card.get_marriage_partner())
+        self._Unshare('knownEmptySuits')
+        self.knownEmptySuits[player] = knownEmptySuits
+
+        self.playerToMove = player
+        self.pointsTaken = pointsTaken
+        self.sharedContainers.discard('pointsTaken')
+        self.gamePointsAtStake = gamePointsAtStake
+        self.isTalonClosed = isTalonClosed
+        self.whoClosedTalon = whoClosedTalon
+        self.winner = winner
+        self.publicHash = publicHash
+        self.talonHash = talonHash
+        self.handHashes = {1: handHash1, 2: handHash2}
+        self.sharedContainers.discard('handHashes')
+
+    def GetMoveHistory(self):
+        """
+        Get the moves made with DoMove on this game state since the deal, oldest first.
+
+        Like UndoMove, this does not include moves made before the state was cloned.
+        """
+        return [record[0] for record in self.undoStack]
+
     def GetTrickWinner(self, completed_trick):
         """
         Determine the winner of a trick in which all players have played.
 
         Returns the winner as a player id.
-
-        Sort the plays in the trick:
-        First, those that followed suit (in ascending rank order).
-        Then, any trump plays (also in ascending rank order).
-        The winning play is the last element in sortedPlays.
         """
-        (leader, leadCard) = completed_trick[0]
-        suited_plays = [
-            (player, card.score)
-            for (player, card) in completed_trick
-            if card.suit == leadCard.suit
-        ]
-        trump_plays = [
-            (player, card.score)
-            for (player, card) in completed_trick
-            if card.suit == self.trumpSuit
-        ]
-        sorted_plays = sorted(
-            suited_plays, key=lambda player_score: player_score[1]
-        ) + sorted(trump_plays, key=lambda player_score: player_score[1])
-        return sorted_plays[-1][0]
+        ((leader, leadCard), (follower, followCard)) = completed_trick
+        if TRICK_WINNER_TABLE[self.trumpSuit][leadCard.id * NUM_CARDS + followCard.id]:
+            return follower
+        return leader
+
+    def WinsCurrentTrick(self, card):
+        """Return True if playing the given card would win the current (started) trick."""
+        leadCard = self.currentTrick[0][1]
+        return bool(TRICK_WINNER_TABLE[self.trumpSuit][leadCard.id * NUM_CARDS + card.id])
 
     def GetMoves(self):
-        """Get all possible moves from this state."""
+        """
+        Get all possible moves from this state.
+
+        The list is cached until the state changes, so callers must not modify it.
+        """
+        if self.cachedMoves is None:
+            self.cachedMoves = self.GenerateMoves()
+        return self.cachedMoves
+
+    def GetMoveMask(self):
+        """Get the codes of all possible moves from this state as a bitmask."""
+        mask = 0
+        for move in self.GetMoves():
+            mask |= 1 << move.code
+        return mask
+
+    def GenerateMoves(self):
+        """Generate all possible moves from this state, bypassing the cache."""
         # If the winner already exists, no further moves are possible.
         if self.winner is not None:
             return []
@@ -443,6 +897,63 @@ class SchnapsenGameState(GameState):
             # not marriages or closing the talon.
             return [SchnapsenMove(card=card, close_talon=False) for card in currentHand]
 
+    def DoRandomRollout(self, rng=random):
+        """
+        Play uniformly random moves until the result of the game is decided.
+
+        This plays like repeatedly choosing from GetMoves, but picks a playable card
+        (and closes an open talon with probability 1/2 when leading) without listing moves.
+        The game may be left unfinished once IsResultDecided, as GetResult is then final.
+        """
+        while not self.IsResultDecided():
+            self.DoMove(self.GetRandomMove(rng))
+
+    def IsResultDecided(self):
+        """
+        Return True if GetResult can no longer change.
+
+        Besides finished games, this is the case when the player who closed the talon can
+        no longer reach 66 points, even by taking every card left and declaring every
+        marriage in their hand.
+        """
+        if self.winner is not None:
+            return True
+        closer = self.whoClosedTalon
+        if closer is None:
+            return False
+        hand = self.playerHands[closer]
+        reachable = self.pointsTaken[closer] + sum(card.score for _, card in self.currentTrick)
+        for p in self.players:
+            reachable += sum(card.score for card in self.playerHands[p])
+        for card in hand:
+            if card.rank == 13 and card.marriage_partner in hand:
+                reachable += 40 if card.suit == self.trumpSuit else 20
+        return reachable < 66
+
+    def GetRandomMove(self, rng=random):
+        """Return a uniformly random move from this state, which must not be terminal."""
+        currentHand = self.playerHands[self.playerToMove]
+        if self.currentTrick == []:
+            card = rng.choice(currentHand)
+            marriage_partner = card.marriage_partner
+            if (marriage_partner is not None) and (marriage_partner in currentHand):
+                marriageIndex = 2 if card.suit == self.trumpSuit else 1
+            else:
+                marriageIndex = 0
+            closeTalon = not self.isTalonClosed and rng.getrandbits(1)
+            return MOVE_TABLE[6 * card.id + 3 * closeTalon + marriageIndex]
+        if not self.isTalonClosed:
+            return MOVE_TABLE[6 * rng.choice(currentHand).id]
+        # Talon is closed and current player does not lead: the same rules as GenerateMoves.
+        leadCard = self.currentTrick[0][1]
+        sameSuitPlays = [card for card in currentHand if card.suit == leadCard.suit]
+        sameSuitWinners = [card for card in sameSuitPlays if card.score > leadCard.score]
+        availablePlays = (
+            sameSuitWinners or sameSuitPlays or
+            [card for card in currentHand if card.suit == self.trumpSuit] or currentHand
+        )
+        return MOVE_TABLE[6 * rng.choice(availablePlays).id]
+
     def GetResult(self, player):
         """
         Get the game result from the viewpoint of player.
@@ -494,7 +1005,7 @@ class SchnapsenGameState(GameState):
         result += ' | Trick: ['
         result += ', '.join((' %i: %s' % (player, card)) for (player, card) in self.currentTrick)
         result += ']'
-        result += ' | Cards left: {}'.format(len(self.deck))
+        result += ' | Cards left: {}'.format(len(self.talon) - self.talonIndex)
         result += ' | Stake: {}'.format(self.gamePointsAtStake)
         result += ' | Empty: ' + ', '.join(
             [
@@ -508,4 +1019,438 @@ class SchnapsenGameState(GameState):
 
     def deep_repr(self):
         """A representation of all information in the game state from an omniscient POV."""
-        return self.__repr__() + '\nDeck: ' + ', '.join([card.__repr__() for card in self.deck])
+        return self.__repr__() + '\nDeck: ' + ', '.join(
+            [card.__repr__() for card in self.deck]
+        )
+
+    @property
+    def deck(self):
+        """The cards remaining in the talon, with the face-up card on the bottom."""
+        return self.talon[self.talonIndex:]
+
+
+class BitmaskSchnapsenGameState(SchnapsenGameState):
+    """
+    A state of the game Schnapsen in which every set of cards is a card mask.
+
+    Hands, discards, revealed marriage cards and known empty suits are integers whose bits
+    index into FULL_DECK, so membership, removal and suit filtering are bitwise operations.
+    The list-based attributes of SchnapsenGameState remain available as read-only views.
+    """
+
+    def __init__(self, omniscient_players=set()):
+        """Initialize the game state."""
+        self.numberOfPlayers = 2
+        self.players = [1, 2]
+        self.handMasks = {p: 0 for p in self.players}
+        self.omniscient_players = omniscient_players
+        self.playerToMove = 1
+        self.revealedMasks = {p: 0 for p in self.players}
+        self.emptySuitMasks = {p: 0 for p in self.players}
+        self.isTalonClosed = False
+        self.whoClosedTalon = None
+        self.gamePointsAtStake = {1: 1.0, 2: 1.0}
+        self.winner = None
+        # Note: this sets other attributes.
+        self.Deal()
+
+    @classmethod
+    def FromState(cls, state):
+        """Create a bitmask game state equivalent to the given list-based game state."""
+        st = object.__new__(cls)
+        st.numberOfPlayers = state.numberOfPlayers
+        st.players = state.players
+        st.omniscient_players = state.omniscient_players
+        st.playerToMove = state.playerToMove
+        st.handMasks = {p: cards_to_mask(state.playerHands[p]) for p in state.players}
+        st.revealedMasks = {
+            p: cards_to_mask(state.marriageCardsRevealed[p]) for p in state.players
+        }
+        st.emptySuitMasks = {
+            p: sum(SUIT_MASKS[suit] for suit in state.knownEmptySuits[p]) for p in state.players
+        }
+        st.discardMask = cards_to_mask(state.discards)
+        if state.currentTrick:
+            (st.leadPlayer, leadCard) = state.currentTrick[0]
+            st.leadCard = leadCard.id
+        else:
+            st.leadPlayer = None
+            st.leadCard = None
+        st.trumpSuit = state.trumpSuit
+        st.trumpMask = SUIT_MASKS[state.trumpSuit]
+        st.faceUpCard = state.faceUpCard
+        st.pointsTaken = {p: state.pointsTaken[p] for p in state.players}
+        st.isTalonClosed = state.isTalonClosed
+        st.whoClosedTalon = state.whoClosedTalon
+        st.gamePointsAtStake = state.gamePointsAtStake
+        st.talon = [card.id for card in state.deck]
+        st.talonIndex = 0
+        st.winner = state.winner
+        st.undoStack = []
+        st.cachedMoves = None
+        return st
+
+    def Clone(self):
+        """
+        Create a deep clone of this game state.
+
+        The clone starts with an empty undo stack.
+        """
+        st = object.__new__(BitmaskSchnapsenGameState)
+        st.numberOfPlayers = self.numberOfPlayers
+        st.players = self.players
+        st.omniscient_players = self.omniscient_players
+        st.playerToMove = self.playerToMove
+        st.handMasks = dict(self.handMasks)
+        st.revealedMasks = dict(self.revealedMasks)
+        st.emptySuitMasks = dict(self.emptySuitMasks)
+        st.discardMask = self.discardMask
+        st.leadPlayer = self.leadPlayer
+        st.leadCard = self.leadCard
+        st.trumpSuit = self.trumpSuit
+        st.trumpMask = self.trumpMask
+        st.faceUpCard = self.faceUpCard
+        st.pointsTaken = dict(self.pointsTaken)
+        st.isTalonClosed = self.isTalonClosed
+        st.whoClosedTalon = self.whoClosedTalon
+        st.gamePointsAtStake = self.gamePointsAtStake
+        st.talon = self.talon
+        st.talonIndex = self.talonIndex
+        st.winner = self.winner
+        st.undoStack = []
+        st.cachedMoves = self.cachedMoves
+        return st
+
+    def CloneAndRandomize(self, observer, rng=random):
+        """
+        Create a deep clone of this game state.
+
+        All information not visible to the specified observer player is randomized, with
+        the random generator rng.
+        """
+        st = self.Clone()
+        # If the observer is omniscient, do not randomize.
+        if observer in self.omniscient_players:
+            return st
+        # Only the observer's own legal moves are unaffected by randomization.
+        if observer != st.playerToMove:
+            st.cachedMoves = None
+
+        other_player = self.GetNextPlayer(observer)
+        faceUpBit = 1 << st.faceUpCard.id
+        trickMask = 0 if st.leadCard is None else 1 << st.leadCard
+        # The observer has seen its own hand, all played cards, the face-up card
+        # and the other player's declared marriages.
+        seenMask = (
+            st.handMasks[observer] | st.discardMask | trickMask | faceUpBit |
+            st.revealedMasks[other_player]
+        )
+        # Unseen cards of the suits the other player lacks must be in the (closed) talon.
+        talonOnlyMask = st.emptySuitMasks[other_player] & ~seenMask
+        seenMask |= st.emptySuitMasks[other_player]
+        unseenCards = list(iter_mask(FULL_DECK_MASK & ~seenMask))
+        rng.shuffle(unseenCards)
+
+        # Deal cards to the other player, accounting for revealed marriages.
+        handMask = st.revealedMasks[other_player]
+        # If the talon is empty and the face-up card has not been played,
+        # the other player must have it.
+        isTalonEmpty = st.talonIndex == len(st.talon)
+        if isTalonEmpty and not (faceUpBit & (st.handMasks[observer] | st.discardMask | trickMask)):
+            handMask |= faceUpBit
+        numCardsToDeal = count_cards(st.handMasks[other_player]) - count_cards(handMask)
+        for idx in unseenCards[:numCardsToDeal]:
+            handMask |= 1 << idx
+        st.handMasks[other_player] = handMask
+
+        # The rest of the unseen cards form the talon.
+        st.talon = unseenCards + list(iter_mask(talonOnlyMask))
+        st.talonIndex = numCardsToDeal
+        # If there are cards left in the talon, the face-up card is on the bottom.
+        if st.talonIndex != len(st.talon):
+            st.talon.append(st.faceUpCard.id)
+
+        return st
+
+    def Deal(self):
+        """Reset the game state for the beginning of a new round and deal the cards."""
+        self.discardMask = 0
+        self.leadPlayer = None
+        self.leadCard = None
+        self.pointsTaken = {p: 0 for p in self.players}
+        self.undoStack = []
+        self.cachedMoves = None
+
+        # Shuffle the card indices and deal them to the players.
+        deck = list(range(len(FULL_DECK)))
+        random.shuffle(deck)
+        for idx, p in enumerate(self.players):
+            self.handMasks[p] = sum(1 << card for card in deck[5 * idx: 5 * (idx + 1)])
+
+        # The remaining cards form the talon, read from talonIndex on.
+        self.talon = deck
+        self.talonIndex = 5 * len(self.players)
+        # Choose the trump suit for this round.
+        self.faceUpCard = FULL_DECK[self.talon[-1]]
+        self.trumpSuit = self.faceUpCard.suit
+        self.trumpMask = SUIT_MASKS[self.trumpSuit]
+
+    def DoMove(self, move):
+        """
+        Update a state by carrying out the given move.
+
+        Must update playerToMove.
+        The move is recorded on the undo stack so that UndoMove can revert it.
+        """
+        player = self.playerToMove
+        other_player = (player % 2) + 1
+        pointsTaken = self.pointsTaken
+        self.cachedMoves = None
+
+        # Every field this move may change is an integer, so the record is a plain snapshot.
+        self.undoStack.append((
+            move, player, self.handMasks[1], self.handMasks[2],
+            self.revealedMasks[player], self.emptySuitMasks[player], self.discardMask,
+            self.leadPlayer, self.leadCard, pointsTaken[1], pointsTaken[2],
+            self.gamePointsAtStake, self.isTalonClosed, self.whoClosedTalon, self.talonIndex,
+            self.winner,
+        ))
+
+        if self.whoClosedTalon is None:
+            self.gamePointsAtStake = {
+                player: 3.0 - math.ceil(pointsTaken[other_player] / 33),
+                other_player: 3.0 - math.ceil(pointsTaken[player] / 33)
+            }
+
+        # Close the talon if part of the current SchnapsenMove.
+        if move.close_talon:
+            self.isTalonClosed = True
+            self.whoClosedTalon = player
+            game_points_if_closer_wins = 3.0 - math.ceil(pointsTaken[other_player] / 33)
+            self.gamePointsAtStake = {
+                player: game_points_if_closer_wins,
+                other_player: max(game_points_if_closer_wins, 2.0)
+            }
+
+        idx = move.card.id
+        bit = 1 << idx
+
+        # Check for marriages, updating known information about the game state.
+        if move.marriage_points is not None:
+            pointsTaken[player] += move.marriage_points
+            self.revealedMasks[player] |= 1 << MARRIAGE_PARTNER_INDEX[idx]
+            # End game if the marriage puts the current player over 66 points.
+            if pointsTaken[player] >= 66:
+                self.winner = player
+                return
+
+        # Remove the card from the player's hand and revealed marriage cards.
+        self.handMasks[player] &= ~bit
+        self.revealedMasks[player] &= ~bit
+
+        # The current player leads: wait for the other player.
+        if self.leadCard is None:
+            self.leadPlayer = player
+            self.leadCard = idx
+            self.playerToMove = other_player
+            return
+
+        leadCard = self.leadCard
+        # If the talon is closed and the suits differ, the current player lacks the lead suit.
+        if self.isTalonClosed and not (bit & CARD_SUIT_MASKS[leadCard]):
+            self.emptySuitMasks[player] |= CARD_SUIT_MASKS[leadCard]
+            # If additionally neither card was trump, the current player is out of trump.
+            if not (self.trumpMask & (bit | (1 << leadCard))):
+                self.emptySuitMasks[player] |= self.trumpMask
+
+        if TRICK_WINNER_TABLE[self.trumpSuit][leadCard * NUM_CARDS + idx]:
+            trick_winner = player
+        else:
+            trick_winner = self.leadPlayer
+
+        # Update the game state.
+        pointsTaken[trick_winner] += CARD_SCORES[leadCard] + CARD_SCORES[idx]
+        self.discardMask |= bit | (1 << leadCard)
+        self.leadPlayer = None
+        self.leadCard = None
+        self.playerToMove = trick_winner
+
+        # Both players draw from the talon if applicable.
+        if not self.isTalonClosed:
+            self.handMasks[trick_winner] |= 1 << self.talon[self.talonIndex]
+            self.handMasks[(trick_winner % 2) + 1] |= 1 << self.talon[self.talonIndex + 1]
+            self.talonIndex += 2
+            # Close the talon if no cards remain.
+            if self.talonIndex == len(self.talon):
+                self.isTalonClosed = True
+        elif not (self.handMasks[1] | self.handMasks[2]):
+            # Determine the winner when no one has any cards left.
+            if pointsTaken[1] < 66 and pointsTaken[2] < 66:
+                # If someone closed the talon but no one has 66 points, that player loses.
+                if self.whoClosedTalon is not None:
+                    self.winner = (self.whoClosedTalon % 2) + 1
+                    return
+                # If the talon is empty and no one has 66 points, the last trick wins.
+                elif self.talonIndex == len(self.talon):
+                    self.winner = trick_winner
+                    return
+
+        # If the trick winner has enough points, they win.
+        if pointsTaken[trick_winner] >= 66:
+            self.winner = trick_winner
+
+    def UndoMove(self):
+        """
+        Revert the most recent move made with DoMove on this game state.
+
+        Moves made before the state was cloned cannot be undone on the clone.
+        """
+        (
+            move, player, self.handMasks[1], self.handMasks[2],
+            self.revealedMasks[player], self.emptySuitMasks[player], self.discardMask,
+            self.leadPlayer, self.leadCard, self.pointsTaken[1], self.pointsTaken[2],
+            self.gamePointsAtStake, self.isTalonClosed, self.whoClosedTalon, self.talonIndex,
+            self.winner,
+        ) = self.undoStack.pop()
+        self.playerToMove = player
+        self.cachedMoves = None
+
+    def GetPlayableMask(self):
+        """Get the mask of the cards the player to move may play."""
+        # If the winner already exists, no further moves are possible.
+        if self.winner is not None:
+            return 0
+
+        hand = self.handMasks[self.playerToMove]
+        if self.leadCard is not None and self.isTalonClosed:
+            # Must match suit and win, else match suit, else play trump, else play anything.
+            sameSuit = hand & CARD_SUIT_MASKS[self.leadCard]
+            return (
+                (sameSuit & HIGHER_CARD_MASKS[self.leadCard]) or sameSuit or
+                (hand & self.trumpMask) or hand
+            )
+        return hand
+
+    def GetMoveMask(self):
+        """Get the codes of all possible moves from this state as a bitmask."""
+        mask = 0
+        for idx in iter_mask(self.GetPlayableMask()):
+            mask |= 1 << (2 * idx)
+        # Every lead may also close an open talon.
+        if self.leadCard is None and not self.isTalonClosed:
+            mask |= mask << 1
+        return mask
+
+    def GenerateMoves(self):
+        """Generate all possible moves from this state, bypassing the cache."""
+        playable = self.GetPlayableMask()
+        if self.leadCard is not None:
+            return [MOVE_TABLE[6 * idx] for idx in iter_mask(playable)]
+
+        # The current player leads: any card is playable, declaring available marriages.
+        moveIndices = []
+        for idx in iter_mask(playable):
+            partner = MARRIAGE_PARTNER_INDEX[idx]
+            if partner is not None and playable & (1 << partner):
+                moveIndices.append(6 * idx + (2 if self.trumpMask & (1 << idx) else 1))
+            else:
+                moveIndices.append(6 * idx)
+        moves = [MOVE_TABLE[moveIdx] for moveIdx in moveIndices]
+        if self.isTalonClosed:
+            return moves
+        # The talon is open, so every lead may also close it.
+        return moves + [MOVE_TABLE[moveIdx + 3] for moveIdx in moveIndices]
+
+    def IsResultDecided(self):
+        """
+        Return True if GetResult can no longer change.
+
+        Besides finished games, this is the case when the player who closed the talon can
+        no longer reach 66 points, even by taking every card left and declaring every
+        marriage in their hand.
+        """
+        if self.winner is not None:
+            return True
+        closer = self.whoClosedTalon
+        if closer is None:
+            return False
+        hand = self.handMasks[closer]
+        remaining = self.handMasks[1] | self.handMasks[2]
+        if self.leadCard is not None:
+            remaining |= 1 << self.leadCard
+        reachable = self.pointsTaken[closer] + count_points(remaining)
+        for marriageMask in MARRIAGE_MASKS:
+            if hand & marriageMask == marriageMask:
+                reachable += 40 if marriageMask & self.trumpMask else 20
+        return reachable < 66
+
+    def GetRandomMove(self, rng=random):
+        """Return a uniformly random move from this state, which must not be terminal."""
+        playable = self.GetPlayableMask()
+        # Pick the k-th playable card, lowest index first.
+        for _ in range(rng.randrange(count_cards(playable))):
+            playable &= playable - 1
+        idx = (playable & -playable).bit_length() - 1
+        if self.leadCard is not None:
+            return MOVE_TABLE[6 * idx]
+        partner = MARRIAGE_PARTNER_INDEX[idx]
+        if partner is not None and self.handMasks[self.playerToMove] & (1 << partner):
+            marriageIndex = 2 if self.trumpMask & (1 << idx) else 1
+        else:
+            marriageIndex = 0
+        closeTalon = not self.isTalonClosed and rng.getrandbits(1)
+        return MOVE_TABLE[6 * idx + 3 * closeTalon + marriageIndex]
+
+    def ComputeHashes(self):
+        """Do nothing: this engine computes its Zobrist hashes on demand."""
+
+    def GetStateHash(self):
+        """Return a 64-bit Zobrist hash of the full (determinized) game state."""
+        (publicHash, talonHash, handHashes) = compute_zobrist_hashes(self)
+        return publicHash ^ talonHash ^ handHashes[1] ^ handHashes[2]
+
+    def GetInfoSetHash(self, observer):
+        """Return a 64-bit Zobrist hash of the information set of the given observer."""
+        if observer in self.omniscient_players:
+            return self.GetStateHash()
+        (publicHash, _, handHashes) = compute_zobrist_hashes(self)
+        return publicHash ^ handHashes[observer]
+
+    def WinsCurrentTrick(self, card):
+        """Return True if playing the given card would win the current (started) trick."""
+        return bool(TRICK_WINNER_TABLE[self.trumpSuit][self.leadCard * NUM_CARDS + card.id])
+
+    @property
+    def playerHands(self):
+        """The cards in each player's hand."""
+        return {p: mask_to_cards(self.handMasks[p]) for p in self.players}
+
+    @property
+    def marriageCardsRevealed(self):
+        """The marriage cards each player has revealed but not yet played."""
+        return {p: set(mask_to_cards(self.revealedMasks[p])) for p in self.players}
+
+    @property
+    def knownEmptySuits(self):
+        """The suits each player is known to lack."""
+        return {
+            p: {suit for suit in SUITS if self.emptySuitMasks[p] & SUIT_MASKS[suit]}
+            for p in self.players
+        }
+
+    @property
+    def discards(self):
+        """The cards played in previous tricks."""
+        return mask_to_cards(self.discardMask)
+
+    @property
+    def currentTrick(self):
+        """The (player, card) pairs played in the current trick."""
+        if self.leadCard is None:
+            return []
+        return [(self.leadPlayer, FULL_DECK[self.leadCard])]
+
+    @property
+    def deck(self):
+        """The cards remaining in the talon, with the face-up card on the bottom."""
+        return [FULL_DECK[idx] for idx in self.talon[self.talonIndex:]]
@@ -0,0 +1,231 @@
+"""
+Exact solvers for perfect-information positions of Schnapsen.
+
+Once the talon is closed or exhausted, a determinized game state is a small game of
+perfect information: no cards are drawn and every card left is in one of the two hands.
+EndgameSolver finds its value under optimal play by alpha-beta search.
+For omniscient players, who also know the order of the talon, the whole game is one of
+perfect information. GameSolver solves it by iterative deepening within a time budget.
+"""
+import time
+
+from schnapsen import BitmaskSchnapsenGameState
+
+# The kinds of values kept in a transposition table.
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+# The number of states a solver visits between checks of its deadline.
+DEADLINE_CHECK_INTERVAL = 256
+
+
+class _OutOfTime(Exception):
+    """Raised by a solver whose deadline has passed, to abandon the search."""
+
+
+class EndgameSolver(object):
+    """
+    An alpha-beta solver for Schnapsen game states without hidden information.
+
+    The solver plays the game with DoMove and UndoMove of BitmaskSchnapsenGameState, so it
+    follows the rules (and the game points at stake) exactly as the game does. The value of
+    a state is GetResult(1) once both players play optimally, i.e. player 1 maximizes it
+    and player 2 minimizes it.
+
+    The transposition table is kept between calls, so states solved in one call speed up
+    the next, e.g. for other determinizations of the same search.
+    """
+
+    def __init__(self, capacity=1 << 18):
+        """Initialize a solver whose transposition table holds up to capacity states."""
+        self.capacity = capacity
+        self.table = {}
+        self.nodes = 0
+        # The time (of time.monotonic) to give up by, and whether a search stopped at its depth
+        # limit, see GameSolver.
+        self.deadline = None
+        self.reachedHorizon = False
+
+    def CanSolve(self, state):
+        """Return True if state is one this solver is meant for: its talon is closed."""
+        return state.isTalonClosed
+
+    def Solve(self, state):
+        """Return the value of state for player 1 under optimal play."""
+        return self._Search(self._ToBitmaskState(state), float('-inf'), float('inf'))
+
+    def BestMove(self, state):
+        """Return a move of optimal play from state, which must not be decided yet."""
+        bitmaskState = self._ToBitmaskState(state)
+        self._Search(bitmaskState, float('-inf'), float('inf'))
+        move = self.table[self._Key(bitmaskState)][2]
+        # Return the move as state has it, like the searches in ISMCTS do.
+        moves = state.GetMoves()
+        return moves[moves.index(move)]
+
+    def PlayOut(self, state):
+        """Play optimal moves in state until its result is decided."""
+        bitmaskState = self._ToBitmaskState(state)
+        while not bitmaskState.IsResultDecided():
+            move = self.BestMove(bitmaskState)
+            if bitmaskState is not state:
+                moves = state.GetMoves()
+                state.DoMove(moves[moves.index(move)])
+            bitmaskState.DoMove(move)
+
+    @staticmethod
+    def _ToBitmaskState(state):
+        """Return state itself if it is a bitmask state, else an equivalent bitmask state."""
+        if isinstance(state, BitmaskSchnapsenGameState):
+            return state
+        return BitmaskSchnapsenGameState.FromState(state)
+
+    @staticmethod
+    def _Key(state):
+        """
+        Return the transposition table key of a state.
+
+        It holds everything the rest of the game depends on. The game points at stake only
+        matter once someone closed the talon, as they are recomputed before every move until
+        then, and the talon only matters while it is open.
+        """
+        if state.whoClosedTalon is None:
+            stakes = None
+        else:
+            stakes = (state.gamePointsAtStake[1], state.gamePointsAtStake[2])
+        if state.isTalonClosed:
+            talon = state.talonIndex == len(state.talon)
+        else:
+            talon = tuple(state.talon[state.talonIndex:])
+        return (
+            state.handMasks[1], state.handMasks[2], state.leadCard, state.playerToMove,
+            state.pointsTaken[1], state.pointsTaken[2], state.trumpSuit, state.whoClosedTalon,
+            stakes, talon
+        )
+
+    @staticmethod
+    def _OrderMoves(moves, bestMove):
+        """
+        Return moves in the order to search them.
+
+        The best move found before comes first, then marriages and high cards, which tend
+        to decide the game sooner.
+        """
+        ordered = sorted(
+            moves, key=lambda move: -((move.marriage_points or 0) + move.card.score)
+        )
+        if bestMove is not None:
+            ordered.remove(bestMove)
+            ordered.insert(0, bestMove)
+        return ordered
+
+    @staticmethod
+    def _Estimate(state):
+        """Return a guess of the value of state for player 1, strictly between -1 and 1."""
+        return (state.pointsTaken[1] - state.pointsTaken[2]) / 120.0
+
+    def _Search(self, state, alpha, beta, depth=float('inf')):
+        """
+        Return the value of state for player 1 if it lies between alpha and beta.
+
+        Otherwise return a bound beyond alpha or beta, as alpha-beta search does.
+        States depth moves ahead count as leaves worth _Estimate, and then reachedHorizon
+        is set as the value is not exact. Raise _OutOfTime once the deadline has passed.
+        """
+        if state.IsResultDecided():
+            return state.GetResult(1)
+        if depth <= 0:
+            self.reachedHorizon = True
+            return self._Estimate(state)
+        self.nodes += 1
+        if self.deadline is not None and self.nodes % DEADLINE_CHECK_INTERVAL == 0:
+            if time.monotonic() >= self.deadline:
+                raise _OutOfTime()
+
+        key = self._Key(state)
+        entry = self.table.get(key)
+        bestMove = None
+        if entry is not None:
+            (value, bound, bestMove, entryDepth) = entry
+            if entryDepth >= depth and (
+                bound == EXACT or (
+                    bound == LOWER_BOUND and value >= beta
+                ) or (
+                    bound == UPPER_BOUND and value <= alpha
+                )
+            ):
+                # Values found with a depth limit rest on estimates.
+                if entryDepth != float('inf'):
+                    self.reachedHorizon = True
+                return value
+
+        # Find out whether this state's value rests on estimates, apart from earlier states.
+        reachedHorizon = self.reachedHorizon
+        self.reachedHorizon = False
+        (originalAlpha, originalBeta) = (alpha, beta)
+        maximizing = state.playerToMove == 1
+        best = float('-inf') if maximizing else float('inf')
+        for move in self._OrderMoves(state.GetMoves(), bestMove):
+            state.DoMove(move)
+            value = self._Search(state, alpha, beta, depth - 1)
+            state.UndoMove()
+            if maximizing and value > best:
+                (best, bestMove) = (value, move)
+                alpha = max(alpha, value)
+            elif not maximizing and value < best:
+                (best, bestMove) = (value, move)
+                beta = min(beta, value)
+            if alpha >= beta:
+                break
+
+        if best <= originalAlpha:
+            bound = UPPER_BOUND
+        elif best >= originalBeta:
+            bound = LOWER_BOUND
+        else:
+            bound = EXACT
+        if len(self.table) >= self.capacity:
+            self.table.clear()
+        self.table[key] = (best, bound, bestMove, depth if self.reachedHorizon else float('inf'))
+        self.reachedHorizon = self.reachedHorizon or reachedHorizon
+        return best
+
+
+class GameSolver(EndgameSolver):
+    """
+    An iterative deepening solver for Schnapsen game states without hidden information.
+
+    It is meant for whole games, whose talon is still open (its order being known to
+    omniscient players) and which may take too long to solve. It searches one trick (two
+    moves) deeper at a time, each search ordering its moves by the best moves of the last
+    one, until the value is exact or time runs out.
+    """
+
+    def SolveWithin(self, state, timeLimit):
+        """
+        Return an optimal move from state, or None if solving takes over timeLimit seconds.
+
+        The search runs on a clone, so the state is left unchanged even if the search is
+        abandoned halfway. If the result of the state is decided, every move is optimal.
+        """
+        bitmaskState = self._ToBitmaskState(state).Clone()
+        if bitmaskState.IsResultDecided():
+            return state.GetMoves()[0]
+        self.deadline = time.monotonic() + timeLimit
+        try:
+            depth = 2
+            while True:
+                self.reachedHorizon = False
+                self._Search(bitmaskState, float('-inf'), float('inf'), depth)
+                if not self.reachedHorizon:
+                    break
+                depth += 2
+        except _OutOfTime:
+            return None
+        finally:
+            self.deadline = None
+            self.reachedHorizon = False
+        move = self.table[self._Key(bitmaskState)][2]
+        moves = state.GetMoves()
+        return moves[moves.index(move)]
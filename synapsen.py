@@ -3,14 +3,20 @@ import argparse
 import random
 
 from players import ComputerPlayer, HumanPlayer
-from schnapsen import SchnapsenGameState
+from schnapsen import BitmaskSchnapsenGameState, SchnapsenGameState
 
 DIFFICULTY_TO_ITERMAX_MAP = {
     'trivial': 1,   # For testing purposes only!
     'easy': 500,
     'medium': 1500,
     'hard': 5000,
-    'insane': 5000
+    'insane': 5000,
+    'timed': None   # Searches until the time limit runs out.
+}
+
+ENGINE_TO_GAME_STATE_MAP = {
+    'list': SchnapsenGameState,
+    'bitmask': BitmaskSchnapsenGameState,
 }
 
 
@@ -22,7 +28,8 @@ def PlayGame(**kwargs):
     omniscient_players = {
         idx for idx in players_by_index if players_by_index[idx].is_omniscient
     }
-    state = SchnapsenGameState(omniscient_players=omniscient_players)
+    game_state_class = ENGINE_TO_GAME_STATE_MAP[kwargs.get('engine') or 'list']
+    state = game_state_class(omniscient_players=omniscient_players)
 
     while (state.GetMoves() != []):
         # Get the current player.
@@ -34,11 +41,22 @@ def PlayGame(**kwargs):
         if game_type == 'computer-computer':
             print(state)
 
+        # The other players may think about the game while a human player decides, but not
+        # while a computer player searches, as they would compete for the same CPU.
+        if player.type == 'human':
+            for idx in players_by_index:
+                if idx != state.playerToMove:
+                    players_by_index[idx].ponder(state)
+
         # The current player selects a move.
         move = player.select_move(state, verbose=(game_type == 'computer-computer'))
         print('Player {} played {}!\n'.format(state.playerToMove, move))
         state.DoMove(move)
 
+    for idx in players_by_index:
+        players_by_index[idx].stop_pondering()
+        players_by_index[idx].close()
+
     if state.winner:
         print('Player {} wins!'.format(str(state.winner)))
     else:
@@ -60,22 +78,34 @@ def _kwargs_to_players(**kwargs):
             player = ComputerPlayer(
                 _id=idx + 1,
                 itermax=DIFFICULTY_TO_ITERMAX_MAP[kwargs['difficulty']],
-                is_omniscient=(kwargs['difficulty'] == 'insane')
+                is_omniscient=(kwargs['difficulty'] == 'insane'),
+                workers=kwargs.get('workers') or 1,
+                threads=kwargs.get('threads') or 1,
+                time_limit=kwargs.get('time_limit'),
+                reuse_tree=bool(kwargs.get('reuse_tree')),
+                ponder=bool(kwargs.get('ponder')),
+                solve_endgames=bool(kwargs.get('solve_endgames'))
             )
         else:
             # If multiple difficulties are specified, use the second for the second computer player.
             player = ComputerPlayer(
                 _id=idx + 1,
                 itermax=DIFFICULTY_TO_ITERMAX_MAP[kwargs['difficulty2']],
-                is_omniscient=(kwargs['difficulty2'] == 'insane')
+                is_omniscient=(kwargs['difficulty2'] == 'insane'),
+                workers=kwargs.get('workers') or 1,
+                threads=kwargs.get('threads') or 1,
+                time_limit=kwargs.get('time_limit'),
+                reuse_tree=bool(kwargs.get('reuse_tree')),
+                ponder=bool(kwargs.get('ponder')),
+                solve_endgames=bool(kwargs.get('solve_endgames'))
             )
         players.append(player)
 
     return {idx + 1: player for idx, player in enumerate(players)}
 
 
-def _get_arguments():
-    """Get command line arguments to start a game of Schnapsen."""
+def _get_arguments(args=None):
+    """Get command line arguments (by default from sys.argv) to start a game of Schnapsen."""
     parser = argparse.ArgumentParser(description='This begins a game of Schnapsen.')
 
     parser.add_argument(
@@ -104,6 +134,7 @@ def _get_arguments():
                 - medium
                 - hard
                 - insane
+                - timed (requires a time limit)
         """.strip(),
         required=False,
         default='medium',
@@ -120,11 +151,67 @@ def _get_arguments():
                 - medium
                 - hard
                 - insane
+                - timed (requires a time limit)
         """.strip(),
         required=False,
         type=str
     )
 
+    parser.add_argument(
+        '-e', '--engine',
+        help="""
+            The game state implementation used by the game and the computer players.
+
+            Available options are:
+                - list
+                - bitmask
+        """.strip(),
+        required=False,
+        default='list',
+        type=str
+    )
+
+    parser.add_argument(
+        '-w', '--workers',
+        help='The number of processes searching in parallel for each computer player.',
+        required=False,
+        default=1,
+        type=int
+    )
+
+    parser.add_argument(
+        '-t', '--threads',
+        help='The number of threads sharing the search tree of each computer player.',
+        required=False,
+        default=1,
+        type=int
+    )
+
+    parser.add_argument(
+        '-tl', '--time-limit',
+        help='The maximum number of seconds each computer player may think about a move.',
+        required=False,
+        type=float
+    )
+
+    parser.add_argument(
+        '-rt', '--reuse-tree',
+        help='Keep the search tree of each computer player between its moves.',
+        action='store_true'
+    )
+
+    parser.add_argument(
+        '-p', '--ponder',
+        help='Let computer players think during the turns of a human player.',
+        action='store_true'
+    )
+
+    parser.add_argument(
+        '-se', '--solve-endgames',
+        help='Let computer players solve positions with a closed talon exactly.',
+        action='store_true'
+    )
+
     parser.add_argument(
         '-s', '--seed',
         help='The seed for the random state.',
@@ -132,7 +219,11 @@ def _get_arguments():
         type=int
     )
 
-    return parser.parse_args().__dict__
+    arguments = parser.parse_args(args)
+    timed = 'timed' in (arguments.difficulty, arguments.difficulty2)
+    if timed and arguments.time_limit is None:
+        parser.error('the timed difficulty requires a time limit (-tl/--time-limit)')
+    return arguments.__dict__
 
 
 if __name__ == '__main__':
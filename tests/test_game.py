@@ -1,7 +1,10 @@
 """Test basic AI functionality."""
 import random
 
+import pytest
+
 import synapsen
+from players import ComputerPlayer
 
 # Use a fixed random seed to ensure consistency across separate test runs.
 random.seed(1)
@@ -10,3 +13,26 @@ random.seed(1)
 def test_computer_vs_computer():
     """Initialize two computer players and have them play a quick game."""
     synapsen.PlayGame(game_type='computer-computer', difficulty='trivial')
+
+
+def test_players_only_ponder_during_human_turns(monkeypatch):
+    """Computer players ponder while a human player decides, not while a computer searches."""
+    pondered = []
+    monkeypatch.setattr(
+        ComputerPlayer, 'ponder', lambda player, state: pondered.append(state.playerToMove)
+    )
+    synapsen.PlayGame(game_type='computer-computer', difficulty='trivial', ponder=True)
+    assert pondered == []
+    monkeypatch.setattr('builtins.input', lambda prompt: '1')
+    synapsen.PlayGame(game_type='human-computer', difficulty='trivial', ponder=True)
+    assert pondered != [] and set(pondered) == {1}
+
+
+def test_timed_difficulty_requires_a_time_limit():
+    """The timed difficulty is rejected without a time limit."""
+    with pytest.raises(SystemExit):
+        synapsen._get_arguments(['-gt', 'computer-computer', '-d', 'timed'])
+    with pytest.raises(SystemExit):
+        synapsen._get_arguments(['-gt', 'computer-computer', '-d', 'easy', '-d2', 'timed'])
+    arguments = synapsen._get_arguments(['-gt', 'computer-computer', '-d', 'timed', '-tl', '0.1'])
+    assert arguments['time_limit'] == 0.1
@@ -0,0 +1,292 @@
+"""Test the ISMCTS search implementations."""
+import math
+import random
+import sys
+import threading
+import time
+
+import pytest
+
+from ISMCTS import (
+    STRATEGIES, VALUATION_FUNCTIONS, ISMCTS, ArrayISMCTS, ArrayTree, Node, ParallelISMCTS,
+    SearchIterations, SearchTree, TreeParallelISMCTS, get_terminal_values,
+    get_terminal_values_by_strategy, is_root_decided
+)
+import players
+import synapsen
+from players import ComputerPlayer
+from schnapsen import BitmaskSchnapsenGameState, SchnapsenGameState
+
+# Use a fixed random seed to ensure consistency across separate test runs.
+random.seed(1)
+
+
+def test_array_tree_matches_node_tree(capsys):
+    """Both tree representations build the same root statistics from the same random sequence."""
+    for seed in range(20):
+        random.seed(seed)
+        state = SchnapsenGameState()
+        for _ in range(random.randint(0, 12)):
+            moves = state.GetMoves()
+            if moves == []:
+                break
+            state.DoMove(random.choice(moves))
+        if state.GetMoves() == []:
+            continue
+        for strategy in ('id', 'win', 'get_at_least_2'):
+            random.seed(seed)
+            expected = ISMCTS(state, itermax=200, strategy=strategy, verbose=True)
+            expected_stats = capsys.readouterr().out
+            random.seed(seed)
+            assert ArrayISMCTS(state, itermax=200, strategy=strategy, verbose=True) == expected
+            assert capsys.readouterr().out == expected_stats
+
+
+def test_array_tree_links():
+    """Children are kept in insertion order and found by their moves."""
+    state = SchnapsenGameState()
+    moves = state.GetMoves()
+    tree = ArrayTree(capacity=2)
+    children = [tree.AddChild(0, m=move, playerJustMoved=1) for move in moves]
+    assert tree.Children(0) == children
+    assert tree.size == len(moves) + 1
+    for child, move in zip(children, moves):
+        assert tree.FindChild(0, move) == child
+        assert tree.parent[child] == 0
+        assert tree.Node(child).parentNode.index == 0
+    assert tree.GetUntriedMoves(0, moves) == []
+    assert tree.IsFullyExpanded(0, state.GetMoveMask())
+    assert not tree.IsFullyExpanded(children[0], state.GetMoveMask())
+
+
+def test_ucb_selection_matches_reference_formula():
+    """Selection picks the first legal child with the highest UCB1 score and bumps avails."""
+    state = SchnapsenGameState()
+    moves = state.GetMoves()
+    for _ in range(200):
+        root = Node(strategy='id')
+        for move in moves:
+            child = root.AddChild(m=move, playerJustMoved=1, isTalonClosed=False,
+                                  whoClosedTalon=None)
+            child.visits = random.randint(1, 3)
+            child.wins = random.randint(-3, 3) * child.visits
+            child.avails = child.visits + random.randint(0, 3)
+        legalMoves = random.sample(moves, random.randint(1, len(moves)))
+        legalChildren = [child for child in root.childNodes if child.move in legalMoves]
+        avails = [child.avails for child in legalChildren]
+        expected = max(
+            legalChildren,
+            key=lambda c: (float(c.wins) / c.visits + 3) / 6 +
+            0.8 * math.sqrt(math.log(c.avails) / c.visits)
+        )
+        assert root.UCBSelectChild(legalMoves) is expected
+        assert [child.avails for child in legalChildren] == [a + 1 for a in avails]
+
+
+def test_terminal_values_match_results():
+    """Precomputed terminal values are the valuations of each player's result."""
+    for _ in range(50):
+        state = SchnapsenGameState()
+        while state.GetMoves() != []:
+            state.DoMove(random.choice(state.GetMoves()))
+        for valuation in VALUATION_FUNCTIONS.values():
+            values = get_terminal_values(state, valuation)
+            assert values[0] == 0.0
+            for p in state.players:
+                assert values[p] == valuation['function'](state.GetResult(p))
+
+
+def test_one_search_reports_every_strategy():
+    """Keeping the wins of every strategy does not change the search and reports each best move."""
+    for seed in range(5):
+        state = SchnapsenGameState()
+        random.seed(seed)
+        expected = ISMCTS(state, itermax=300, strategy='win')
+        random.seed(seed)
+        report = {}
+        assert ISMCTS(state, itermax=300, strategy='win', report=report) == expected
+        assert sorted(report) == sorted(VALUATION_FUNCTIONS)
+        assert set(report.values()) <= set(state.GetMoves())
+
+
+def test_report_on_a_reused_tree():
+    """A report also works on a tree searched without one before."""
+    state = SchnapsenGameState()
+    rootnode = Node()
+    ISMCTS(state, itermax=200, rootnode=rootnode)
+    report = {}
+    ISMCTS(state, itermax=1, rootnode=rootnode, report=report)
+    assert sorted(report) == sorted(VALUATION_FUNCTIONS)
+    assert set(report.values()) <= set(state.GetMoves())
+    assert sum(c.strategyVisits for c in rootnode.childNodes) == 1
+
+
+def test_strategy_wins_match_single_strategy_wins():
+    """The wins of each strategy equal the wins of a node updated with that strategy alone."""
+    state = SchnapsenGameState()
+    while state.GetMoves() != []:
+        state.DoMove(random.choice(state.GetMoves()))
+    node = Node(playerJustMoved=1)
+    valuesByStrategy = get_terminal_values_by_strategy(state)
+    node.Update([0.0, 1.0, -1.0], valuesByStrategy)
+    node.Update([0.0, 1.0, -1.0], valuesByStrategy)
+    for idx, strategy in enumerate(STRATEGIES):
+        values = get_terminal_values(state, VALUATION_FUNCTIONS[strategy])
+        assert node.strategyWins[idx] == 2 * values[1]
+
+
+def test_root_parallel_search_merges_workers(capsys):
+    """Root-parallel searches sum the root statistics of every worker."""
+    for state_class in (SchnapsenGameState, BitmaskSchnapsenGameState):
+        for tree in ('node', 'array'):
+            state = state_class()
+            move = ParallelISMCTS(state, itermax=50, workers=2, tree=tree, verbose=True)
+            assert move in state.GetMoves()
+            lines = capsys.readouterr().out.strip().splitlines()
+            assert sum(int(line.split('/')[-2]) for line in lines) == 100
+
+
+def test_tree_parallel_search_removes_virtual_losses(capsys):
+    """Virtual losses are taken back, leaving one visit per iteration."""
+    state = SchnapsenGameState()
+    TreeParallelISMCTS(state, itermax=100, threads=1, virtualLoss=3, verbose=True)
+    lines = capsys.readouterr().out.strip().splitlines()
+    assert sum(int(line.split('/')[-2]) for line in lines) == 100
+    for strategy in ('id', 'win'):
+        assert TreeParallelISMCTS(state, itermax=200, strategy=strategy, threads=3) in \
+            state.GetMoves()
+
+
+def test_tree_parallel_threads_share_nodes(monkeypatch):
+    """Threads expanding and selecting in the same nodes at once neither fail nor lose work."""
+    errors = []
+    monkeypatch.setattr(threading, 'excepthook', errors.append)
+    # Switch threads often to make them meet in the same nodes.
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for _ in range(20):
+            state = SchnapsenGameState()
+            for _ in range(random.randrange(2, 8)):
+                state.DoMove(random.choice(state.GetMoves()))
+            assert TreeParallelISMCTS(state, itermax=1000, threads=8) in state.GetMoves()
+    finally:
+        sys.setswitchinterval(interval)
+    assert errors == []
+    # A second thread expanding the same move keeps the first child and adds its virtual loss.
+    root = Node(shared=True)
+    move = SchnapsenGameState().GetMoves()[0]
+    children = [
+        root.AddChild(move, playerJustMoved=1, isTalonClosed=False, whoClosedTalon=None,
+                      virtualLoss=1, shared=True)
+        for _ in range(2)
+    ]
+    assert children[0] is children[1]
+    assert root.childNodes == [children[0]] and children[0].visits == 2
+
+
+def test_rollouts_per_leaf_count_as_visits(capsys):
+    """Every iteration with several rollouts adds that many visits along its path."""
+    for search in (ISMCTS, ArrayISMCTS):
+        state = SchnapsenGameState()
+        assert search(state, itermax=50, rollouts=4, verbose=True) in state.GetMoves()
+        lines = capsys.readouterr().out.strip().splitlines()
+        assert sum(int(line.split('/')[-2]) for line in lines) == 200
+        report = {}
+        assert ISMCTS(state, itermax=50, rollouts=3, report=report) in state.GetMoves()
+        assert sorted(report) == sorted(VALUATION_FUNCTIONS)
+
+
+def test_search_budgets():
+    """Searches stop at their time or node budget and return a legal move."""
+    state = SchnapsenGameState()
+    rootnode = SearchTree(state, itermax=None, maxNodes=100)
+    assert 100 <= rootnode.visits < 100 + 16
+    start = time.monotonic()
+    for search in (ISMCTS, ArrayISMCTS, TreeParallelISMCTS):
+        assert search(state, itermax=None, timeLimit=0.1) in state.GetMoves()
+    assert time.monotonic() - start < 1.0
+    with pytest.raises(ValueError):
+        list(SearchIterations(itermax=None))
+
+
+def test_early_stopping():
+    """Searches stop once the root decision is settled and report the iterations saved."""
+    valuation = VALUATION_FUNCTIONS['win']
+    assert is_root_decided([(5.0, 10)], 1, None, valuation)
+    assert is_root_decided([(5.0, 30), (1.0, 9)], 2, 20, valuation)
+    assert not is_root_decided([(5.0, 30), (1.0, 10)], 2, 20, valuation)
+    assert not is_root_decided([(5.0, 30)], 2, None, valuation, confidence=0.9)
+    assert is_root_decided([(950.0, 1000), (10.0, 1000)], 2, None, valuation, confidence=0.95)
+    assert not is_root_decided([(55.0, 100), (45.0, 100)], 2, None, valuation, confidence=0.95)
+    for search in (ISMCTS, ArrayISMCTS):
+        state = SchnapsenGameState()
+        random.seed(2)
+        expected = search(state, itermax=2000)
+        random.seed(2)
+        statistics = {}
+        assert search(state, itermax=2000, earlyStop=True, statistics=statistics) == expected
+        assert statistics['iterations'] + statistics['iterationsSaved'] == 2000
+        statistics = {}
+        search(state, itermax=2000, confidence=0.5, statistics=statistics)
+        assert statistics['iterationsSaved'] >= 0
+
+
+def test_computer_player_reuses_its_tree():
+    """A player keeps the subtree of the moves played since its last search."""
+    for state_class in (SchnapsenGameState, BitmaskSchnapsenGameState):
+        state = state_class()
+        players = {p: ComputerPlayer(p, itermax=200, reuse_tree=True) for p in state.players}
+        reused = 0
+        while state.GetMoves() != []:
+            player = players[state.playerToMove]
+            move = player.select_move(state)
+            rootnode = player.last_search[2]
+            assert rootnode.parentNode is None
+            reused += rootnode.visits > 200
+            state.DoMove(move)
+        assert reused > 0
+
+
+def test_computer_player_ponders_on_the_other_turn(monkeypatch):
+    """Pondering searches the other player's turn and warms up the next search."""
+    state = SchnapsenGameState()
+    pondering_player = ComputerPlayer(2, itermax=100, ponder=True)
+    pondering_player.ponder(state)
+    time.sleep(0.2)
+    state.DoMove(ComputerPlayer(1, itermax=100).select_move(state))
+    pondering_player.stop_pondering()
+    rootnode = pondering_player.last_search[2]
+    assert rootnode.visits > 0
+    assert pondering_player.ponder_thread is None
+    if state.playerToMove == 2:
+        assert pondering_player.select_move(state) in state.GetMoves()
+        assert pondering_player.last_search[2].visits > 100
+    # A game of a human against a pondering player ends with its background search stopped.
+    monkeypatch.setattr('builtins.input', lambda prompt: '1')
+    synapsen.PlayGame(game_type='human-computer', difficulty='trivial', ponder=True)
+
+
+def test_pondering_stops_at_its_node_budget(monkeypatch):
+    """Pondering without max_nodes stops by itself once the tree has PONDER_MAX_NODES nodes."""
+    monkeypatch.setattr(players, 'PONDER_MAX_NODES', 100)
+    pondering_player = ComputerPlayer(2, itermax=None, ponder=True)
+    pondering_player.ponder(SchnapsenGameState())
+    pondering_player.ponder_thread.join(timeout=10)
+    assert not pondering_player.ponder_thread.is_alive()
+    assert 100 <= pondering_player.last_search[2].visits < 100 + 16
+
+
+def test_computer_player_closes_its_pool():
+    """Root-parallel players keep their worker processes until they are closed."""
+    state = SchnapsenGameState()
+    player = ComputerPlayer(_id=state.playerToMove, itermax=20, workers=2)
+    assert player.select_move(state) in state.GetMoves()
+    pool = player.pool
+    assert pool is not None
+    assert player.select_move(state) in state.GetMoves()
+    assert player.pool is pool
+    player.close()
+    assert player.pool is None
+    with pytest.raises(ValueError):
+        pool.apply(sum, ([],))
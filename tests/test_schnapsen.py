@@ -0,0 +1,281 @@
+"""Test the Schnapsen game state implementations."""
+import copy
+import pickle
+import random
+
+import synapsen
+from schnapsen import (
+    FULL_DECK, MOVE_TABLE, SUITS, BitmaskSchnapsenGameState, Card, SchnapsenGameState,
+    SchnapsenMove, compute_zobrist_hashes, get_trick_winner_by_sorting
+)
+
+# Use a fixed random seed to ensure consistency across separate test runs.
+random.seed(1)
+
+
+def _public_fields(state):
+    """Return the parts of a game state that both implementations must agree on."""
+    return repr((
+        state.playerToMove,
+        {p: sorted(map(repr, state.playerHands[p])) for p in state.players},
+        {p: sorted(map(repr, state.marriageCardsRevealed[p])) for p in state.players},
+        {p: sorted(state.knownEmptySuits[p]) for p in state.players},
+        sorted(map(repr, state.discards)),
+        [(player, repr(card)) for (player, card) in state.currentTrick],
+        list(map(repr, state.deck)),
+        state.pointsTaken,
+        state.isTalonClosed,
+        state.whoClosedTalon,
+        state.gamePointsAtStake,
+        state.winner,
+    ))
+
+
+def test_bitmask_state_matches_list_state():
+    """Play random games with both implementations side by side."""
+    for _ in range(200):
+        state = SchnapsenGameState()
+        bitmask_state = BitmaskSchnapsenGameState.FromState(state)
+        while True:
+            assert _public_fields(state) == _public_fields(bitmask_state)
+            assert state.IsResultDecided() == bitmask_state.IsResultDecided()
+            # Hands may be listed in other orders, but the talon is the same.
+            assert state.deep_repr().split('Deck: ')[1] == \
+                bitmask_state.deep_repr().split('Deck: ')[1]
+            moves = state.GetMoves()
+            assert sorted(map(repr, moves)) == sorted(map(repr, bitmask_state.GetMoves()))
+            if moves == []:
+                break
+            move = random.choice(moves)
+            state.DoMove(move)
+            bitmask_state.DoMove(move)
+        for p in state.players:
+            assert state.GetResult(p) == bitmask_state.GetResult(p)
+
+
+def test_bitmask_clone_and_randomize_keeps_observer_view():
+    """Randomizing a state must not change anything the observer can see."""
+    for _ in range(200):
+        state = BitmaskSchnapsenGameState()
+        for _ in range(random.randint(0, 12)):
+            moves = state.GetMoves()
+            if moves == []:
+                break
+            state.DoMove(random.choice(moves))
+        observer = state.playerToMove
+        other_player = state.GetNextPlayer(observer)
+        st = state.CloneAndRandomize(observer)
+        assert st.handMasks[observer] == state.handMasks[observer]
+        assert st.discardMask == state.discardMask
+        assert st.leadCard == state.leadCard
+        assert len(st.playerHands[other_player]) == len(state.playerHands[other_player])
+        assert st.revealedMasks[other_player] & ~st.handMasks[other_player] == 0
+        assert not st.handMasks[other_player] & st.handMasks[observer]
+        assert not st.handMasks[other_player] & st.emptySuitMasks[other_player]
+
+
+def test_computer_vs_computer_bitmask():
+    """Play a quick game on the bitmask engine."""
+    synapsen.PlayGame(game_type='computer-computer', difficulty='trivial', engine='bitmask')
+
+
+def test_cards_are_interned():
+    """Every way of obtaining a card returns the same instance."""
+    for card in FULL_DECK:
+        assert Card(card.rank, card.suit) is card
+        assert pickle.loads(pickle.dumps(card)) is card
+        assert copy.deepcopy(card) is card
+        assert FULL_DECK[card.id] is card
+        partner = card.get_marriage_partner()
+        if card.rank in {12, 13}:
+            assert partner.get_marriage_partner() is card
+            assert partner.suit == card.suit and partner.rank != card.rank
+        else:
+            assert partner is None
+
+
+def test_trick_winner_table_matches_sorting():
+    """The trick-winner lookup table agrees with the sorting reference implementation."""
+    state = SchnapsenGameState()
+    for trump_suit in SUITS:
+        state.trumpSuit = trump_suit
+        for leadCard in FULL_DECK:
+            for followCard in FULL_DECK:
+                if leadCard is followCard:
+                    continue
+                trick = [(2, leadCard), (1, followCard)]
+                expected = get_trick_winner_by_sorting(trick, trump_suit)
+                assert state.GetTrickWinner(trick) == expected
+                state.currentTrick = trick[:1]
+                assert state.WinsCurrentTrick(followCard) == (expected == 1)
+
+
+def test_undo_move_restores_state():
+    """Undoing moves restores every field of both implementations, in order."""
+    for state_class in (SchnapsenGameState, BitmaskSchnapsenGameState):
+        for _ in range(100):
+            state = state_class()
+            history = [(_public_fields(state), repr(state.playerHands))]
+            while state.GetMoves() != []:
+                move = random.choice(state.GetMoves())
+                state.DoMove(move)
+                snapshot = (_public_fields(state), repr(state.playerHands))
+                state.UndoMove()
+                assert (_public_fields(state), repr(state.playerHands)) == history[-1]
+                state.DoMove(move)
+                history.append(snapshot)
+            while history:
+                assert (_public_fields(state), repr(state.playerHands)) == history.pop()
+                if history:
+                    state.UndoMove()
+            assert state.undoStack == []
+
+
+def _play_randomly(state, num_moves):
+    """Make up to num_moves random moves in the given game state."""
+    for _ in range(num_moves):
+        moves = state.GetMoves()
+        if moves == []:
+            break
+        state.DoMove(random.choice(moves))
+
+
+def test_clones_do_not_affect_each_other():
+    """Clones share containers, but changing one state never changes another."""
+    for _ in range(200):
+        state = SchnapsenGameState()
+        _play_randomly(state, random.randint(0, 12))
+        original = (_public_fields(state), repr(state.playerHands))
+        clone = state.Clone()
+        randomized = state.CloneAndRandomize(state.playerToMove)
+        randomized_fields = (_public_fields(randomized), repr(randomized.playerHands))
+        _play_randomly(clone, 20)
+        if clone.undoStack:
+            clone.UndoMove()
+        assert (_public_fields(state), repr(state.playerHands)) == original
+        _play_randomly(state, 20)
+        if state.undoStack:
+            state.UndoMove()
+        assert (_public_fields(randomized), repr(randomized.playerHands)) == randomized_fields
+
+
+def test_cached_moves_match_generated_moves():
+    """Cached legal moves are reused until the state changes and stay correct for clones."""
+    for state_class in (SchnapsenGameState, BitmaskSchnapsenGameState):
+        for _ in range(100):
+            state = state_class()
+            _play_randomly(state, random.randint(0, 12))
+            moves = state.GetMoves()
+            assert state.GetMoves() is moves
+            for p in state.players:
+                st = state.CloneAndRandomize(p)
+                assert repr(st.GetMoves()) == repr(st.GenerateMoves())
+            if moves != []:
+                state.DoMove(random.choice(moves))
+                assert repr(state.GetMoves()) == repr(state.GenerateMoves())
+                state.UndoMove()
+                assert repr(state.GetMoves()) == repr(moves)
+
+
+def test_moves_are_interned():
+    """Moves are singletons whose codes match their equality and the move masks."""
+    for move in MOVE_TABLE:
+        assert SchnapsenMove(move.card, move.close_talon, move.marriage_points) is move
+        assert pickle.loads(pickle.dumps(move)) is move
+        assert move == SchnapsenMove(move.card, move.close_talon)
+        assert hash(move) == move.code
+    for state_class in (SchnapsenGameState, BitmaskSchnapsenGameState):
+        for _ in range(100):
+            state = state_class()
+            _play_randomly(state, random.randint(0, 20))
+            assert state.GetMoveMask() == sum(1 << move.code for move in state.GetMoves())
+
+
+def test_zobrist_hashes_are_incremental():
+    """Incremental Zobrist hashes match hashes computed from scratch by either engine."""
+    for _ in range(100):
+        state = SchnapsenGameState()
+        while True:
+            bitmask_state = BitmaskSchnapsenGameState.FromState(state)
+            assert (state.publicHash, state.talonHash, state.handHashes) == \
+                compute_zobrist_hashes(state)
+            assert state.GetStateHash() == bitmask_state.GetStateHash()
+            for p in state.players:
+                assert state.GetInfoSetHash(p) == bitmask_state.GetInfoSetHash(p)
+                # Randomizing hidden information keeps the observer's information set.
+                randomized = state.CloneAndRandomize(p)
+                assert randomized.GetInfoSetHash(p) == state.GetInfoSetHash(p)
+                assert (randomized.publicHash, randomized.talonHash, randomized.handHashes) == \
+                    compute_zobrist_hashes(randomized)
+                assert bitmask_state.CloneAndRandomize(p).GetInfoSetHash(p) == \
+                    state.GetInfoSetHash(p)
+            moves = state.GetMoves()
+            if moves == []:
+                break
+            stateHash = state.GetStateHash()
+            state.DoMove(random.choice(moves))
+            assert state.GetStateHash() != stateHash
+            state.UndoMove()
+            assert state.GetStateHash() == stateHash
+            state.DoMove(random.choice(moves))
+
+
+def test_move_history():
+    """Both engines record the moves made since the deal, and forget undone ones."""
+    for state_class in (SchnapsenGameState, BitmaskSchnapsenGameState):
+        state = state_class()
+        history = []
+        while state.GetMoves() != []:
+            move = random.choice(state.GetMoves())
+            state.DoMove(move)
+            history.append(move)
+            assert state.GetMoveHistory() == history
+        state.UndoMove()
+        assert state.GetMoveHistory() == history[:-1]
+        assert state.Clone().GetMoveHistory() == []
+
+
+def test_random_rollouts_play_legal_games():
+    """Random rollouts only make legal moves and end the game, from any state."""
+    for state_class in (SchnapsenGameState, BitmaskSchnapsenGameState):
+        for _ in range(200):
+            state = state_class()
+            _play_randomly(state, random.randint(0, 12))
+            rollout = state.CloneAndRandomize(state.playerToMove)
+            replay = rollout.Clone()
+            rollout.DoRandomRollout()
+            assert rollout.IsResultDecided()
+            for move in rollout.GetMoveHistory():
+                assert repr(move) in map(repr, replay.GetMoves())
+                replay.DoMove(move)
+            # Finishing a game whose result is decided does not change the result.
+            _play_randomly(replay, 20)
+            assert replay.GetMoves() == []
+            for p in state.players:
+                assert replay.GetResult(p) == rollout.GetResult(p)
+
+
+def test_random_moves_are_uniform():
+    """Every legal move is about equally likely to be picked."""
+    for state_class in (SchnapsenGameState, BitmaskSchnapsenGameState):
+        state = state_class()
+        _play_randomly(state, 1)
+        counts = {move: 0 for move in state.GetMoves()}
+        for _ in range(2000):
+            counts[state.GetRandomMove()] += 1
+        assert sum(counts.values()) == 2000
+        for count in counts.values():
+            assert abs(count - 2000 / len(counts)) < 0.3 * 2000 / len(counts)
+
+
+def test_clone_and_randomize_uses_the_given_generator():
+    """Determinizations drawn with equally seeded generators are equal."""
+    for state_class in (SchnapsenGameState, BitmaskSchnapsenGameState):
+        state = state_class()
+        _play_randomly(state, 3)
+        observer = state.playerToMove
+        randomState = random.getstate()
+        first = state.CloneAndRandomize(observer, random.Random(7))
+        second = state.CloneAndRandomize(observer, random.Random(7))
+        assert first.deep_repr() == second.deep_repr()
+        assert random.getstate() == randomState
@@ -0,0 +1,125 @@
+"""Test the exact solvers."""
+import random
+import time
+
+from ISMCTS import ISMCTS, ArrayISMCTS
+from players import ComputerPlayer
+from schnapsen import BitmaskSchnapsenGameState, SchnapsenGameState
+from solver import EndgameSolver, GameSolver
+
+# Use a fixed random seed to ensure consistency across separate test runs.
+random.seed(1)
+
+
+def _closed_talon_state(state_class, omniscient_players=set()):
+    """Play random moves in a new game until the talon is closed, with the result open."""
+    while True:
+        state = state_class(omniscient_players=omniscient_players)
+        while not state.isTalonClosed and state.GetMoves() != []:
+            state.DoMove(random.choice(state.GetMoves()))
+        if not state.IsResultDecided():
+            return state
+
+
+def _minimax(state):
+    """Return the value of state for player 1 by searching every line of play."""
+    moves = state.GetMoves()
+    if moves == []:
+        return state.GetResult(1)
+    values = []
+    for move in moves:
+        state.DoMove(move)
+        values.append(_minimax(state))
+        state.UndoMove()
+    return max(values) if state.playerToMove == 1 else min(values)
+
+
+def test_endgame_solver_matches_minimax():
+    """The solver finds the minimax value of closed or exhausted talons on both engines."""
+    solver = EndgameSolver()
+    for state_class in (SchnapsenGameState, BitmaskSchnapsenGameState):
+        for _ in range(50):
+            state = _closed_talon_state(state_class)
+            fields = repr(state)
+            assert solver.Solve(state) == _minimax(state)
+            # A fresh table gives the same value, and solving leaves the state unchanged.
+            assert EndgameSolver().Solve(state) == solver.Solve(state)
+            assert repr(state) == fields
+
+
+def test_endgame_solver_plays_optimally():
+    """Playing out with the solver keeps the value of the state until the result is decided."""
+    solver = EndgameSolver()
+    for state_class in (SchnapsenGameState, BitmaskSchnapsenGameState):
+        for _ in range(50):
+            state = _closed_talon_state(state_class)
+            value = solver.Solve(state)
+            move = solver.BestMove(state)
+            assert move in state.GetMoves()
+            state.DoMove(move)
+            assert solver.Solve(state) == value
+            solver.PlayOut(state)
+            assert state.IsResultDecided()
+            assert state.GetResult(1) == value
+
+
+def test_search_with_endgame_solver():
+    """An omniscient search that solves its leaves finds an optimal move."""
+    for search in (ISMCTS, ArrayISMCTS):
+        for _ in range(10):
+            state = _closed_talon_state(BitmaskSchnapsenGameState, omniscient_players={1, 2})
+            solver = EndgameSolver()
+            value = solver.Solve(state)
+            move = search(state, itermax=300, solver=solver)
+            state.DoMove(move)
+            assert solver.Solve(state) == value
+
+
+def test_game_solver_solves_open_talons():
+    """The game solver plays optimally while the talon is open, on both engines."""
+    for state_class in (SchnapsenGameState, BitmaskSchnapsenGameState):
+        for _ in range(5):
+            state = state_class()
+            while len(state.deck) > 2 or state.IsResultDecided():
+                state = state_class()
+                while len(state.deck) > 2 and state.GetMoves() != []:
+                    state.DoMove(random.choice(
+                        [move for move in state.GetMoves() if not move.close_talon]
+                    ))
+            value = _minimax(state)
+            fields = repr(state)
+            move = GameSolver().SolveWithin(state, timeLimit=60)
+            assert repr(state) == fields
+            state.DoMove(move)
+            assert EndgameSolver().Solve(state) == value
+
+
+def test_game_solver_time_limit():
+    """The game solver gives up on a whole game when it has no time, leaving the state as is."""
+    state = BitmaskSchnapsenGameState()
+    fields = repr(state)
+    assert GameSolver().SolveWithin(state, timeLimit=0) is None
+    assert repr(state) == fields
+
+
+def test_omniscient_player_solves_the_game():
+    """Omniscient players play legal moves, solving the game once they can."""
+    state = SchnapsenGameState(omniscient_players={1, 2})
+    players = {
+        p: ComputerPlayer(_id=p, itermax=10, is_omniscient=True, solve_time_limit=0.2)
+        for p in state.players
+    }
+    while state.GetMoves() != []:
+        move = players[state.playerToMove].select_move(state)
+        assert move in state.GetMoves()
+        state.DoMove(move)
+    assert state.winner is not None
+
+
+def test_omniscient_player_keeps_to_its_time_limit():
+    """Solving and searching together take about the time limit of an omniscient player."""
+    state = SchnapsenGameState(omniscient_players={1})
+    player = ComputerPlayer(_id=1, itermax=None, time_limit=0.2, is_omniscient=True)
+    start = time.monotonic()
+    assert player.select_move(state) in state.GetMoves()
+    assert time.monotonic() - start < 0.5